@@ -18,11 +18,20 @@ bl_info = {
 add_modules(['booleans',
             'draw_2d',
             'draw_3d',
+            'sparse_matrix',
+            'mesh_arrays',
+            'mesh_analysis',
+            'cap_fill',
+            'reprojection',
+            'quadric_decimate',
+            'attribute_transfer',
             'envelope_builder',
             'interface',
             'mask_tools',
+            'mask_filters',
             'mesh_ops',
             'remesh',
+            'batch_remesh',
             'interactive',
             'slash_cut',
             'object_brush',
@@ -0,0 +1,104 @@
+import numpy as np
+from .mesh_arrays import (MASK_ATTRIBUTE, ATTRIBUTE_VALUES, read_coords, read_polygons, read_attributes,
+                          write_attribute, read_mask, write_mask, mask_layer_get, face_average,
+                          vertex_group_weights, write_vertex_groups)
+from .reprojection import SurfaceProjector, bvh_from_arrays
+from .quadric_decimate import triangulate_loops
+
+# Integer and boolean data can't be blended, it takes the value of the
+# corner with the largest barycentric weight instead.
+DISCRETE_TYPES = {'INT', 'INT8', 'BOOLEAN', 'INT32_2D'}
+
+
+def barycentric_weights(points, a, b, c):
+    # Barycentric coordinates of points in the triangles (a, b, c), clamped to
+    # the triangle so points projected onto an edge don't extrapolate.
+    v0 = b - a
+    v1 = c - a
+    v2 = points - a
+    d00 = (v0 * v0).sum(axis=1)
+    d01 = (v0 * v1).sum(axis=1)
+    d11 = (v1 * v1).sum(axis=1)
+    d20 = (v2 * v0).sum(axis=1)
+    d21 = (v2 * v1).sum(axis=1)
+    denom = d00 * d11 - d01 * d01
+    denom[np.abs(denom) < 1e-30] = 1
+    v = (d11 * d20 - d01 * d21) / denom
+    w = (d00 * d21 - d01 * d20) / denom
+    weights = np.clip(np.column_stack((1 - v - w, v, w)), 0, 1)
+    weights /= np.maximum(weights.sum(axis=1), 1e-12)[:, None]
+    return weights
+
+
+class AttributeTransfer:
+    # Snapshot of an object's mask, face sets, color and other generic
+    # attributes and vertex group weights, taken before its mesh is rebuilt
+    # and resampled onto the new topology afterwards. Every new vertex is
+    # projected onto the triangulated old surface with one batched BVH query
+    # and point and corner data is blended with the barycentric weights of
+    # the hit, face data is taken from the face under every new face center.
+    def __init__(self, ob, workers=1):
+        mesh = ob.data
+        co = read_coords(mesh).astype(np.float64)
+        loop_start, loop_total, loop_verts = read_polygons(mesh)
+        self.tri_loops, self.tri_face = triangulate_loops(loop_start, loop_total)
+        self.tri_verts = loop_verts[self.tri_loops]
+        self.co = co
+        tri_count = len(self.tri_verts)
+        tree = bvh_from_arrays(co, np.arange(0, tri_count * 3, 3), np.full(tri_count, 3), self.tri_verts.ravel())
+        self.projector = SurfaceProjector(tree, workers=workers)
+
+        # UVs don't survive a remesh in any meaningful way.
+        self.attributes = [attribute for attribute in read_attributes(mesh)
+                           if attribute[1] != 'UV' and attribute[0] != MASK_ATTRIBUTE and
+                           not (attribute[1] == 'CORNER' and attribute[2] == 'FLOAT2')]
+        self.mask = read_mask(mesh) if mask_layer_get(mesh) is not None else None
+        self.groups = [group.name for group in ob.vertex_groups]
+        self.weights = vertex_group_weights(ob)
+
+    def sample(self, co):
+        points, _, tri = self.projector.nearest(co)
+        tri = np.maximum(tri, 0)
+        corners = self.tri_verts[tri]
+        weights = barycentric_weights(points, self.co[corners[:, 0]], self.co[corners[:, 1]], self.co[corners[:, 2]])
+        return tri, weights
+
+    @staticmethod
+    def blend(values, corners, weights, discrete=False):
+        if discrete:
+            return values[corners[np.arange(len(corners)), weights.argmax(axis=1)]]
+        if values.ndim > 1:
+            weights = weights[:, :, None]
+        return (values[corners[:, 0]] * weights[:, 0] + values[corners[:, 1]] * weights[:, 1] +
+                values[corners[:, 2]] * weights[:, 2])
+
+    def apply(self, ob):
+        mesh = ob.data
+        if not len(self.tri_verts):
+            return
+        co = read_coords(mesh).astype(np.float64)
+        loop_start, loop_total, loop_verts = read_polygons(mesh)
+        tri, weights = self.sample(co)
+        centers = np.column_stack([face_average(co[:, i], loop_start, loop_total, loop_verts) for i in range(3)])
+        face_tri = self.sample(centers)[0]
+
+        for name, domain, data_type, values in self.attributes:
+            discrete = data_type in DISCRETE_TYPES
+            if domain == 'POINT':
+                values = self.blend(values, self.tri_verts[tri], weights, discrete)
+            elif domain == 'CORNER':
+                # Corners blend the old corners around the hit of their vertex.
+                values = self.blend(values, self.tri_loops[tri[loop_verts]], weights[loop_verts], discrete)
+            else:
+                values = values[self.tri_face[face_tri]]
+            if data_type is not None and not discrete:
+                values = values.astype(ATTRIBUTE_VALUES[data_type][2])
+            write_attribute(mesh, name, domain, data_type, values)
+
+        if self.mask is not None:
+            write_mask(mesh, self.blend(self.mask, self.tri_verts[tri], weights))
+
+        if len(self.groups):
+            weights = self.blend(self.weights, self.tri_verts[tri], weights)
+            write_vertex_groups(ob, self.groups, weights, np.arange(len(weights)))
+        mesh.update()
@@ -0,0 +1,143 @@
+import bpy
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from os import path
+from .multifile import register_class
+
+WORKER_SCRIPT = path.join(path.dirname(path.realpath(__file__)), 'remesh_worker.py')
+
+
+class RemeshJob:
+    def __init__(self, mesh, directory, index):
+        self.name = mesh.name
+        self.source = path.join(directory, f'{index}_source.blend')
+        self.result = path.join(directory, f'{index}_result.blend')
+        self.log = path.join(directory, f'{index}.log')
+        self.process = None
+
+        # Materials are left out of the file so appending the result doesn't
+        # bring copies of them back, the original ones are reassigned instead.
+        mesh = mesh.copy()
+        mesh.materials.clear()
+        bpy.data.libraries.write(self.source, {mesh}, fake_user=True)
+        bpy.data.meshes.remove(mesh)
+
+    def start(self):
+        with open(self.log, 'w') as log:
+            self.process = subprocess.Popen(
+                [bpy.app.binary_path, '-b', '--factory-startup', '--python', WORKER_SCRIPT,
+                 '--', self.source, self.result],
+                stdout=log, stderr=subprocess.STDOUT)
+
+    @property
+    def finished(self):
+        return self.process is not None and self.process.poll() is not None
+
+    def kill(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def swap_in(self):
+        old = bpy.data.meshes.get(self.name)
+        if old is None or self.process.returncode != 0 or not path.exists(self.result):
+            return False
+
+        with bpy.data.libraries.load(self.result) as (data_from, data_to):
+            data_to.meshes = list(data_from.meshes)
+        mesh = data_to.meshes[0]
+        mesh.use_fake_user = False
+        for material in old.materials:
+            mesh.materials.append(material)
+        for ob in bpy.data.objects:
+            if ob.data == old:
+                ob.data = mesh
+        if old.users == 0:
+            bpy.data.meshes.remove(old)
+        mesh.name = self.name
+        return True
+
+
+@register_class
+class BatchVoxelRemesh(bpy.types.Operator):
+    bl_idname = 'sculpt_tool_kit.batch_voxel_remesh'
+    bl_label = 'Batch Voxel Remesh'
+    bl_description = 'Voxel remesh every selected mesh in parallel background Blender processes'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    workers: bpy.props.IntProperty(
+        name='Workers',
+        description='Background processes to run at once, 0 starts one per core',
+        default=0,
+        min=0
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and any(ob.type == 'MESH' for ob in context.selected_objects)
+
+    def invoke(self, context, event):
+        meshes = {ob.data for ob in context.selected_objects if ob.type == 'MESH'}
+        self.directory = tempfile.mkdtemp(prefix='sculpt_tool_kit_remesh_')
+        self.pending = [RemeshJob(mesh, self.directory, i) for i, mesh in enumerate(meshes)]
+        self.running = []
+        self.total = len(self.pending)
+        self.done = 0
+        self.failed = []
+        self.max_workers = self.workers or os.cpu_count() or 1
+        self.start_time = time.perf_counter()
+
+        context.window_manager.progress_begin(0, self.total)
+        self.timer = context.window_manager.event_timer_add(0.2, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        self.dispatch()
+        return {'RUNNING_MODAL'}
+
+    def dispatch(self):
+        while self.pending and len(self.running) < self.max_workers:
+            job = self.pending.pop(0)
+            job.start()
+            self.running.append(job)
+
+    def collect(self):
+        for job in [job for job in self.running if job.finished]:
+            self.running.remove(job)
+            if job.swap_in():
+                self.done += 1
+            else:
+                self.failed.append(job.name)
+
+    def finish(self, context):
+        for job in self.running:
+            job.kill()
+        context.window_manager.event_timer_remove(self.timer)
+        context.window_manager.progress_end()
+        context.area.header_text_set(None)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.finish(context)
+            self.report({'WARNING'}, f'Cancelled, {self.done} of {self.total} meshes remeshed')
+            return {'CANCELLED'} if not self.done else {'FINISHED'}
+
+        if event.type == 'TIMER':
+            self.collect()
+            self.dispatch()
+            finished = self.done + len(self.failed)
+            context.window_manager.progress_update(finished)
+            context.area.header_text_set(f'Voxel remeshing {finished}/{self.total}, '
+                                         f'{len(self.running)} running (Esc to cancel)')
+
+            if not self.running and not self.pending:
+                self.finish(context)
+                if self.failed:
+                    self.report({'WARNING'}, 'Remesh failed for meshes ' + ', '.join(self.failed))
+                self.report({'INFO'}, f'Remeshed {self.done} of {self.total} meshes '
+                                      f'in {time.perf_counter() - self.start_time:.1f} s')
+                return {'FINISHED'}
+
+        return {'PASS_THROUGH'}
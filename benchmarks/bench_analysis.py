@@ -0,0 +1,40 @@
+# Compares the per BMesh element curvature and edge helpers remesh.py used
+# to have against MeshAnalysis, and the cost of a cached lookup.
+import bmesh
+from os import path
+import sys
+
+sys.path.append(path.dirname(path.realpath(__file__)))
+from common import load_module, script_args, sphere_object, timeit, report_speedup
+
+mesh_arrays = load_module('mesh_arrays')
+mesh_analysis = load_module('mesh_analysis')
+
+
+def bmesh_analysis(mesh):
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    curvature = [sum(abs(edge.other_vert(vert).normal.dot(vert.normal)) for edge in vert.link_edges) /
+                 len(vert.link_edges) for vert in bm.verts]
+    directions = [min(vert.link_edges, key=lambda e: e.other_vert(vert).normal.dot(vert.normal))
+                  .other_vert(vert).normal.cross(vert.normal) for vert in bm.verts]
+    lengths = [(edge.verts[0].co - edge.verts[1].co).length_squared for edge in bm.edges]
+    areas = [face.calc_area() for face in bm.faces]
+    bm.free()
+    return curvature, directions, lengths, areas
+
+
+def main():
+    subdivisions, = script_args([7])
+    ob = sphere_object(subdivisions)
+    print(f'vertices: {len(ob.data.vertices)}, faces: {len(ob.data.polygons)}')
+
+    old, _ = timeit('bmesh per element helpers', lambda: bmesh_analysis(ob.data), repeat=1)
+    new, analysis = timeit('MeshAnalysis', lambda: mesh_analysis.MeshAnalysis(mesh_arrays.MeshArrays(ob.data)))
+    report_speedup(old, new)
+    cached, _ = timeit('MeshAnalysis.get cached', lambda: mesh_analysis.MeshAnalysis.get(ob.data))
+    report_speedup(old, cached)
+    print(f'{"mean curvature (radius 1)":<40} {analysis.mean_curvature.mean():10.4f}')
+
+
+main()
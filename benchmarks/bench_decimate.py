@@ -0,0 +1,52 @@
+# Compares the Edit mode decimate operator against the array based quadric
+# decimator on the same displaced grid. The default resolution gives about
+# 2M quads; pass a smaller one for a quick run.
+import bpy
+import numpy as np
+from os import path
+import sys
+
+sys.path.append(path.dirname(path.realpath(__file__)))
+from common import load_module, script_args, grid_object, gradient_mask, timeit, report_speedup
+
+mesh_arrays = load_module('mesh_arrays')
+quadric_decimate = load_module('quadric_decimate')
+
+
+def displaced_grid(resolution):
+    ob = grid_object(resolution)
+    co = mesh_arrays.read_coords(ob.data)
+    co[:, 2] = 0.05 * np.sin(co[:, 0] * 9) * np.cos(co[:, 1] * 7)
+    mesh_arrays.write_coords(ob.data, co)
+    gradient_mask(ob.data)
+    return ob
+
+
+def edit_mode_decimate(ob, ratio):
+    bpy.context.view_layer.objects.active = ob
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_all(action='SELECT')
+    bpy.ops.mesh.decimate(ratio=ratio)
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+
+def main():
+    resolution, ratio = script_args([1415, 0.1])
+    ob = displaced_grid(resolution)
+    source = ob.data.copy()
+    print(f'faces: {len(source.polygons)}, ratio: {ratio}')
+
+    old, _ = timeit('edit mode decimate', lambda: edit_mode_decimate(ob, ratio), repeat=1)
+    print(f'{"faces":<40} {len(ob.data.polygons):10d}')
+
+    ob.data = source.copy()
+    new, _ = timeit('quadric_decimate', lambda: quadric_decimate.decimate_mesh(ob.data, ratio), repeat=1)
+    print(f'{"faces":<40} {len(ob.data.polygons):10d}')
+    report_speedup(old, new)
+
+    ob.data = source.copy()
+    timeit('quadric_decimate mask weighted',
+           lambda: quadric_decimate.decimate_mesh(ob.data, ratio, quadric_decimate.MASK_FACTOR), repeat=1)
+
+
+main()
@@ -0,0 +1,45 @@
+# Compares reading the sculpt mask and per-face mask averages through a
+# BMesh (the old get_bm_and_mask path) against mesh_arrays.
+import bmesh
+from os import path
+import sys
+
+sys.path.append(path.dirname(path.realpath(__file__)))
+from common import load_module, script_args, grid_object, gradient_mask, timeit, report_speedup
+
+mesh_arrays = load_module('mesh_arrays')
+
+
+def bmesh_face_mask(mesh):
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bm.verts.ensure_lookup_table()
+    bm.edges.ensure_lookup_table()
+    bm.faces.ensure_lookup_table()
+    layer = bm.verts.layers.paint_mask.verify()
+    face_mask = [sum(vert[layer] for vert in face.verts) / len(face.verts) for face in bm.faces]
+    bm.free()
+    return face_mask
+
+
+def array_face_mask(arrays):
+    arrays.invalidate()
+    return arrays.face_mask
+
+
+def main():
+    resolution, = script_args([1000])
+    ob = grid_object(resolution)
+    gradient_mask(ob.data)
+    print(f'vertices: {len(ob.data.vertices)}, faces: {len(ob.data.polygons)}')
+
+    arrays = mesh_arrays.MeshArrays(ob.data)
+    old, _ = timeit('bmesh mask + face average', lambda: bmesh_face_mask(ob.data), repeat=1)
+    new, _ = timeit('mesh_arrays mask + face average', lambda: array_face_mask(arrays))
+    report_speedup(old, new)
+
+    mask = arrays.mask.copy()
+    timeit('mesh_arrays write mask', lambda: arrays.write_mask(mask))
+
+
+main()
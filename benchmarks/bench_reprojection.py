@@ -0,0 +1,44 @@
+# Compares snapping BMVerts one at a time (the old surfacce_snap) against
+# SurfaceProjector on the same random query points, with and without a
+# thread pool.
+import bmesh
+import numpy as np
+from os import path, cpu_count
+import sys
+
+sys.path.append(path.dirname(path.realpath(__file__)))
+from common import load_module, script_args, sphere_object, timeit, report_speedup
+
+reprojection = load_module('reprojection')
+
+
+def bmesh_snap(points, tree):
+    bm = bmesh.new()
+    for point in points.tolist():
+        bm.verts.new(point)
+    for vert in bm.verts:
+        location, normal, index, dist = tree.find_nearest(vert.co)
+        if location:
+            vert.co = location
+    bm.free()
+
+
+def main():
+    queries, subdivisions = script_args([1000000, 7])
+    ob = sphere_object(subdivisions)
+    print(f'faces: {len(ob.data.polygons)}, queries: {queries}')
+
+    tree = reprojection.bvh_from_mesh(ob.data)
+    points = np.random.RandomState(0).normal(size=(queries, 3)) * 0.6
+
+    old, _ = timeit('bmesh vertex snap', lambda: bmesh_snap(points, tree), repeat=1)
+    projector = reprojection.SurfaceProjector(tree)
+    new, _ = timeit('SurfaceProjector', lambda: projector.nearest(points), repeat=1)
+    report_speedup(old, new)
+
+    projector.workers = cpu_count()
+    threaded, _ = timeit(f'SurfaceProjector {projector.workers} threads', lambda: projector.nearest(points), repeat=1)
+    report_speedup(old, threaded)
+
+
+main()
@@ -0,0 +1,35 @@
+# Times AttributeTransfer resampling a mask, a color attribute and a vertex
+# group from a sphere onto a denser one. The default target has about 2.6M
+# vertices; pass smaller subdivision levels for a quick run.
+import bpy
+import numpy as np
+from os import path
+import sys
+
+sys.path.append(path.dirname(path.realpath(__file__)))
+from common import load_module, script_args, sphere_object, gradient_mask, timeit
+
+mesh_arrays = load_module('mesh_arrays')
+attribute_transfer = load_module('attribute_transfer')
+
+
+def main():
+    source_level, target_level = script_args([7, 9])
+    source = sphere_object(source_level, 'bench_source')
+    gradient_mask(source.data)
+    co = mesh_arrays.read_coords(source.data)
+    color = source.data.attributes.new('Color', 'FLOAT_COLOR', 'POINT')
+    color.data.foreach_set('color', np.column_stack((co * 0.5 + 0.5, np.ones(len(co)))).astype(np.float32).ravel())
+    mesh_arrays.weights_to_vertex_group(source.vertex_groups.new(name='Group'), co[:, 2] * 0.5 + 0.5)
+
+    target = sphere_object(target_level, 'bench_target')
+    print(f'source vertices: {len(source.data.vertices)}, target vertices: {len(target.data.vertices)}')
+
+    _, transfer = timeit('snapshot', lambda: attribute_transfer.AttributeTransfer(source), repeat=1)
+    timeit('apply', lambda: transfer.apply(target), repeat=1)
+
+    expected = np.clip((mesh_arrays.read_coords(target.data)[:, 0] + 0.25) * 2, 0, 1)
+    print(f'{"max mask error":<40} {np.abs(mesh_arrays.read_mask(target.data) - expected).max():10.4f}')
+
+
+main()
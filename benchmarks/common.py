@@ -0,0 +1,66 @@
+# Helpers shared by the headless benchmarks. Run them with:
+#   blender -b --factory-startup --python benchmarks/<bench>.py -- [args]
+import bpy
+import sys
+import time
+import types
+import importlib
+from os import path
+
+ADDON_DIR = path.dirname(path.dirname(path.realpath(__file__)))
+PACKAGE = 'sculpt_tool_kit_bench'
+
+
+def load_module(name):
+    # Import an add-on module without executing the add-on __init__ (which
+    # registers classes and needs a UI).
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ADDON_DIR]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(PACKAGE + '.' + name)
+
+
+def script_args(defaults):
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    args = list(defaults)
+    for i, value in enumerate(argv[:len(args)]):
+        args[i] = type(defaults[i])(value)
+    return args
+
+
+def grid_object(resolution, name='bench_grid'):
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=resolution, y_subdivisions=resolution, size=2)
+    ob = bpy.context.active_object
+    ob.name = name
+    return ob
+
+
+def sphere_object(subdivisions, name='bench_sphere'):
+    bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=subdivisions, radius=1)
+    ob = bpy.context.active_object
+    ob.name = name
+    return ob
+
+
+def gradient_mask(mesh, axis=0, center=0.0, width=0.5):
+    mesh_arrays = load_module('mesh_arrays')
+    co = mesh_arrays.read_coords(mesh)
+    mask = mesh_arrays.np.clip((co[:, axis] - center) / width + 0.5, 0, 1)
+    mesh_arrays.write_mask(mesh, mask)
+    return mask
+
+
+def timeit(label, func, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<40} {best * 1000:10.2f} ms')
+    return best, result
+
+
+def report_speedup(old, new):
+    print(f'{"speedup":<40} {old / max(new, 1e-9):10.1f} x')
@@ -0,0 +1,107 @@
+import numpy as np
+from mathutils import Vector
+from mathutils.geometry import tessellate_polygon
+from .mesh_arrays import MeshArrays, polygon_edges, loop_next, append_polygons
+
+CAP_METHODS = (('TRIANGULATE', 'Triangulate', 'Fill holes with triangles between the boundary vertices'),
+               ('FAN', 'Fan', 'Fill holes with a triangle fan around a center vertex'),
+               ('GRID', 'Grid', 'Fill holes with rings of quads, better for sculpting'),
+               ('NONE', 'None', 'Leave holes open'))
+
+
+def boundary_chains(loop_start, loop_total, loop_verts):
+    # Open boundary loops in face winding order. Finding the boundary is
+    # vectorized, walking it is proportional to its length only. Vertices
+    # shared by several holes have several outgoing boundary edges, a walk
+    # coming back to one of its own vertices cuts the loop it closed off as a
+    # chain of its own and goes on from there.
+    edges, loop_edges, counts = polygon_edges(loop_start, loop_total, loop_verts)
+    boundary = counts[loop_edges] == 1
+    a = loop_verts[boundary]
+    b = loop_verts[loop_next(loop_start, loop_total)][boundary]
+    successors = {}
+    for vert, next_vert in zip(a.tolist(), b.tolist()):
+        successors.setdefault(vert, []).append(next_vert)
+
+    chains = []
+    while successors:
+        vert = next(iter(successors))
+        chain = [vert]
+        position = {vert: 0}
+        while vert in successors:
+            targets = successors[vert]
+            next_vert = targets.pop()
+            if not targets:
+                del successors[vert]
+            if next_vert in position:
+                start = position[next_vert]
+                if len(chain) - start >= 3:
+                    chains.append(np.array(chain[start:], dtype=np.int32))
+                for cut in chain[start + 1:]:
+                    del position[cut]
+                del chain[start + 1:]
+            else:
+                position[next_vert] = len(chain)
+                chain.append(next_vert)
+            vert = next_vert
+    return chains
+
+
+def ring_faces(outer, inner):
+    return np.column_stack((outer, np.roll(outer, -1), np.roll(inner, -1), inner))
+
+
+def cap_chain(co, chain, first_new, method='TRIANGULATE'):
+    # Returns new vertices, face sizes and face vertex indices for one hole.
+    # Caps run against the boundary winding so they face the same way as the mesh.
+    ring = chain[::-1]
+    points = co[ring].astype(np.float64)
+    center = points.mean(axis=0)
+
+    if method == 'TRIANGULATE':
+        tris = np.array(tessellate_polygon([[Vector(p) for p in points.tolist()]]), dtype=np.int32).reshape(-1, 3)
+        normal = np.cross(points, np.roll(points, -1, axis=0)).sum(axis=0)
+        tri_normals = np.cross(points[tris[:, 1]] - points[tris[:, 0]], points[tris[:, 2]] - points[tris[:, 0]])
+        flip = tri_normals @ normal < 0
+        tris[flip] = tris[flip][:, ::-1]
+        return np.zeros((0, 3)), np.full(len(tris), 3, dtype=np.int32), ring[tris].ravel()
+
+    rings = 0
+    if method == 'GRID':
+        edge_length = np.linalg.norm(points - np.roll(points, -1, axis=0), axis=1).mean()
+        radius = np.linalg.norm(points - center, axis=1).mean()
+        rings = int(np.clip(round(radius / max(edge_length, 1e-12)) - 1, 0, 64))
+
+    n = len(ring)
+    new_co = [points + (center - points) * (i / (rings + 1)) for i in range(1, rings + 1)] + [center[None]]
+    indices = [ring] + [first_new + i * n + np.arange(n, dtype=np.int32) for i in range(rings)]
+    center_index = first_new + rings * n
+
+    faces = [ring_faces(outer, inner).ravel() for outer, inner in zip(indices[:-1], indices[1:])]
+    fan = np.column_stack((indices[-1], np.roll(indices[-1], -1), np.full(n, center_index, dtype=np.int32)))
+    faces.append(fan.ravel())
+    totals = np.concatenate((np.full(rings * n, 4, dtype=np.int32), np.full(n, 3, dtype=np.int32)))
+    return np.concatenate(new_co), totals, np.concatenate(faces).astype(np.int32)
+
+
+def cap_boundaries(co, loop_start, loop_total, loop_verts, method='TRIANGULATE'):
+    new_co = [np.zeros((0, 3))]
+    totals = [np.zeros(0, dtype=np.int32)]
+    verts = [np.zeros(0, dtype=np.int32)]
+    first_new = len(co)
+    for chain in boundary_chains(loop_start, loop_total, loop_verts):
+        chain_co, chain_totals, chain_verts = cap_chain(co, chain, first_new, method)
+        first_new += len(chain_co)
+        new_co.append(chain_co)
+        totals.append(chain_totals)
+        verts.append(chain_verts)
+    return np.concatenate(new_co), np.concatenate(totals), np.concatenate(verts)
+
+
+def fill_holes(mesh, method='TRIANGULATE'):
+    if method == 'NONE':
+        return
+    arrays = MeshArrays(mesh)
+    co, totals, verts = cap_boundaries(arrays.co, *arrays.polygons, method)
+    if len(totals):
+        append_polygons(mesh, co, totals, verts)
@@ -19,11 +19,17 @@ def draw_mask_tools(layout, context):
     ob = context.active_object
     layout.label(text='Mask Tools')
     layout.operator('sculpt_tool_kit.mask_extract')
+    layout.operator('sculpt_tool_kit.mask_extract', text='Extract Mask Islands').separate_islands = True
     layout.operator('sculpt_tool_kit.mask_split')
     layout.operator('sculpt_tool_kit.mask_decimate')
+    row = layout.row(align=True)
+    for type, text in (('GROW', 'Grow'), ('SHRINK', 'Shrink'), ('BLUR', 'Blur'), ('SHARPEN', 'Sharpen')):
+        row.operator('sculpt_tool_kit.mask_filter', text=text).type = type
+    layout.operator('sculpt_tool_kit.mask_from_curvature')
     if ob:
         if not ob.get('MASK_RIG'):
             layout.operator('sculpt_tool_kit.mask_deform_add')
+            layout.operator('sculpt_tool_kit.mask_deform_add', text='Soft Transform Mask').deform_mode = 'TRANSFORM'
         else:
             layout.operator('sculpt_tool_kit.mask_deform_remove')
 
@@ -34,7 +40,13 @@ def draw_remesh_tools(layout, context):
     split = row.split(factor=0.8)
     split.operator('sculpt_tool_kit.voxel_remesh')
     split.operator('sculpt_tool_kit.voxel_remesh', text='', icon='MODIFIER').open_dialog = True
+    op = layout.operator('sculpt_tool_kit.voxel_remesh', text='Voxel Remesh Preview')
+    op.progressive = True
+    op.area = 'OBJECT'
+    layout.operator('sculpt_tool_kit.voxel_remesh', text='Remesh Masked Area').area = 'MASK'
+    layout.operator('sculpt_tool_kit.batch_voxel_remesh')
     layout.operator('sculpt_tool_kit.decimate')
+    layout.operator('sculpt_tool_kit.bdremesh')
     layout.operator('sculpt_tool_kit.s_smooth')
 
 
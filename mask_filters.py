@@ -0,0 +1,218 @@
+import bpy
+import numpy as np
+from collections import OrderedDict
+from .multifile import register_class
+from .mesh_arrays import MeshArrays, topology_fingerprint
+from .sparse_matrix import adjacency_matrix, mean_matrix
+
+
+class AdjacencyCache:
+    # Vertex adjacency of the last topology seen for each mesh, so repeated
+    # filters on the same sculpt don't rebuild the matrices. Least recently
+    # used meshes are dropped once the matrices pass budget, the reprojection
+    # handlers clear it when a file is loaded.
+    entries = OrderedDict()
+    budget = 256 * 2 ** 20
+
+    @classmethod
+    def get(cls, arrays):
+        mesh = arrays.mesh
+        key = mesh.as_pointer()
+        fingerprint = topology_fingerprint(arrays.edges, len(mesh.vertices))
+        entry = cls.entries.get(key)
+        if entry is None or entry[0] != fingerprint:
+            adjacency = adjacency_matrix(arrays.edges, len(mesh.vertices))
+            mean = mean_matrix(adjacency)
+            entry = (fingerprint, adjacency, mean, adjacency.nbytes + mean.nbytes)
+            cls.entries[key] = entry
+        cls.entries.move_to_end(key)
+        cls.evict()
+        return entry[1:3]
+
+    @classmethod
+    def evict(cls):
+        total = sum(entry[3] for entry in cls.entries.values())
+        while total > cls.budget and len(cls.entries) > 1:
+            total -= cls.entries.popitem(last=False)[1][3]
+
+    @classmethod
+    def clear(cls):
+        cls.entries.clear()
+
+
+def mask_grow(adjacency, mask, iterations=1):
+    for _ in range(iterations):
+        mask = adjacency.row_reduce(np.maximum, mask)
+    return mask
+
+
+def mask_shrink(adjacency, mask, iterations=1):
+    for _ in range(iterations):
+        mask = adjacency.row_reduce(np.minimum, mask)
+    return mask
+
+
+def mask_blur(mean, mask, iterations=1):
+    # Repeated half steps towards the neighbor average approximate a
+    # gaussian whose width grows with the square root of the iterations.
+    for _ in range(iterations):
+        mask = (mask + mean @ mask) * 0.5
+    return mask
+
+
+def mask_sharpen(mean, mask, iterations=1, amount=1.0):
+    return np.clip(mask + (mask - mask_blur(mean, mask, iterations)) * amount, 0, 1)
+
+
+def mask_threshold(mask, threshold=0.5):
+    return (mask >= threshold).astype(mask.dtype)
+
+
+def signed_vertex_curvature(co, normals, edges):
+    # Per edge (n_b - n_a) . (p_b - p_a) / |p_b - p_a|^2 averaged around each
+    # vertex: positive on convex areas, negative in cavities. A mean curvature
+    # estimate at a fraction of the cost of the MeshAnalysis tensor fit.
+    a = edges[:, 0]
+    b = edges[:, 1]
+    d = co[b] - co[a]
+    k = ((normals[b] - normals[a]) * d).sum(axis=1) / np.maximum((d * d).sum(axis=1), 1e-12)
+    count = len(co)
+    total = np.bincount(a, weights=k, minlength=count) + np.bincount(b, weights=k, minlength=count)
+    degree = np.bincount(a, minlength=count) + np.bincount(b, minlength=count)
+    return total / np.maximum(degree, 1)
+
+
+def curvature_mask(curvature, source='CURVATURE', threshold=0.5, falloff=0.2):
+    if source == 'CAVITY':
+        value = -curvature
+    elif source == 'CONVEX':
+        value = curvature
+    else:
+        value = np.abs(curvature)
+
+    # Curvature scales with mesh density, so thresholds are relative to the
+    # 95th percentile of its magnitude.
+    scale = np.percentile(np.abs(curvature), 95) if len(curvature) else 1
+    value = value / max(scale, 1e-12)
+    return np.clip((value - threshold) / max(falloff, 1e-6) + 0.5, 0, 1).astype(np.float32)
+
+
+@register_class
+class MaskFromCurvature(bpy.types.Operator):
+    bl_idname = 'sculpt_tool_kit.mask_from_curvature'
+    bl_label = 'Mask From Curvature'
+    bl_description = 'Mask curved, convex or cavity areas of the mesh'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    source: bpy.props.EnumProperty(
+        name='Source',
+        items=(('CURVATURE', 'Curvature', 'Mask both ridges and cavities'),
+               ('CAVITY', 'Cavity', 'Mask concave areas'),
+               ('CONVEX', 'Convex', 'Mask convex areas')),
+        default='CAVITY'
+    )
+
+    threshold: bpy.props.FloatProperty(
+        name='Threshold',
+        description='Curvature where the mask reaches 0.5, relative to the strongest curvature on the mesh',
+        default=0.3,
+        min=-1,
+        max=1
+    )
+
+    falloff: bpy.props.FloatProperty(
+        name='Falloff',
+        description='Width of the transition between unmasked and masked',
+        default=0.2,
+        min=0.001,
+        max=2
+    )
+
+    blend: bpy.props.EnumProperty(
+        name='Blend',
+        items=(('REPLACE', 'Replace', 'Replace the current mask'),
+               ('ADD', 'Add', 'Add to the current mask'),
+               ('MULTIPLY', 'Multiply', 'Intersect with the current mask')),
+        default='REPLACE'
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object and context.active_object.type == 'MESH'
+
+    def execute(self, context):
+        ob = context.active_object
+        last_mode = ob.mode
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+        arrays = MeshArrays(ob.data)
+        curvature = signed_vertex_curvature(arrays.co, arrays.normals, arrays.edges)
+        mask = curvature_mask(curvature, self.source, self.threshold, self.falloff)
+
+        if self.blend == 'ADD':
+            mask = np.minimum(arrays.mask + mask, 1)
+        elif self.blend == 'MULTIPLY':
+            mask = arrays.mask * mask
+
+        arrays.write_mask(mask)
+        bpy.ops.object.mode_set(mode=last_mode)
+        return {'FINISHED'}
+
+
+@register_class
+class MaskFilter(bpy.types.Operator):
+    bl_idname = 'sculpt_tool_kit.mask_filter'
+    bl_label = 'Mask Filter'
+    bl_description = 'Grow, shrink, blur, sharpen or threshold the mask'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    type: bpy.props.EnumProperty(
+        name='Type',
+        items=(('GROW', 'Grow', 'Expand the mask by one ring of vertices per iteration'),
+               ('SHRINK', 'Shrink', 'Contract the mask by one ring of vertices per iteration'),
+               ('BLUR', 'Blur', 'Smooth the mask'),
+               ('SHARPEN', 'Sharpen', 'Increase the contrast of mask borders'),
+               ('THRESHOLD', 'Threshold', 'Turn the mask into a hard mask')),
+        default='BLUR'
+    )
+
+    iterations: bpy.props.IntProperty(
+        name='Iterations',
+        default=1,
+        min=1
+    )
+
+    threshold: bpy.props.FloatProperty(
+        name='Threshold',
+        default=0.5,
+        min=0,
+        max=1
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object and context.active_object.type == 'MESH'
+
+    def execute(self, context):
+        ob = context.active_object
+        last_mode = ob.mode
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+        arrays = MeshArrays(ob.data)
+        adjacency, mean = AdjacencyCache.get(arrays)
+        mask = arrays.mask
+
+        if self.type == 'GROW':
+            mask = mask_grow(adjacency, mask, self.iterations)
+        elif self.type == 'SHRINK':
+            mask = mask_shrink(adjacency, mask, self.iterations)
+        elif self.type == 'BLUR':
+            mask = mask_blur(mean, mask, self.iterations)
+        elif self.type == 'SHARPEN':
+            mask = mask_sharpen(mean, mask, self.iterations)
+        elif self.type == 'THRESHOLD':
+            mask = mask_threshold(mask, self.threshold)
+
+        arrays.write_mask(mask)
+        bpy.ops.object.mode_set(mode=last_mode)
+        return {'FINISHED'}
@@ -1,10 +1,18 @@
 import bpy
 import bmesh
 import numpy as np
+import time
 from mathutils import Vector
 from os import path
 from .multifile import register_class
 from .draw_2d import VerticalSlider, Draw2D
+from .mesh_arrays import (MeshArrays, Submesh, mesh_from_arrays, polygon_edges, loop_next, read_coords,
+                          read_polygon_attribute, write_coords, write_mask, weights_to_vertex_group,
+                          mask_statistics, read_attributes, write_attributes, read_edges, edge_source_index,
+                          vertex_group_weights, write_vertex_groups, read_shape_keys, write_shape_keys)
+from .sparse_matrix import adjacency_matrix, mean_matrix
+from .cap_fill import CAP_METHODS, fill_holes
+from .quadric_decimate import MASK_FACTOR, decimate_object
 
 DEFORM_RIG_PATH = path.join(path.dirname(path.realpath(__file__)), 'Mask Deform Rig.blend')
 
@@ -12,6 +20,10 @@ DEFORM_RIG_PATH = path.join(path.dirname(path.realpath(__file__)), 'Mask Deform
 def create_object_from_bm(bm, matrix_world, name='new_mesh', set_active=False):
     mesh = bpy.data.meshes.new(name=name)
     bm.to_mesh(mesh)
+    return create_object_from_mesh(mesh, matrix_world, name, set_active)
+
+
+def create_object_from_mesh(mesh, matrix_world, name='new_mesh', set_active=False):
     obj = bpy.data.objects.new(name=name, object_data=mesh)
     obj.matrix_world = matrix_world
     bpy.context.collection.objects.link(obj)
@@ -21,18 +33,6 @@ def create_object_from_bm(bm, matrix_world, name='new_mesh', set_active=False):
     return obj
 
 
-def get_bm_and_mask(mesh):
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
-    bm.verts.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.faces.ensure_lookup_table()
-
-    layer = bm.verts.layers.paint_mask.verify()
-
-    return bm, layer
-
-
 def boundary_loops_create(bm, loops=2, smoothing=6, smooth_depth=3):
     edges = [e for e in bm.edges if e.is_boundary]
     for _ in range(loops):
@@ -63,53 +63,202 @@ def boundary_loops_create(bm, loops=2, smoothing=6, smooth_depth=3):
 
 
 class BoundaryPolish:
+    # Relaxes boundary loops along the surface. Each iteration takes the
+    # tangential offset of every boundary vertex from the mean of its boundary
+    # neighbors and pulls it back, spreading the correction to the neighbors.
     def __init__(self, bm):
         bm.verts.ensure_lookup_table()
+        bm.verts.index_update()
+        edges = np.array([(e.verts[0].index, e.verts[1].index) for e in bm.edges if e.is_boundary],
+                         dtype=np.int32).reshape(-1, 2)
+        indices = np.unique(edges)
+        self.verts = [bm.verts[i] for i in indices.tolist()]
+        co = np.array([vert.co for vert in self.verts], dtype=np.float64).reshape(-1, 3)
+        normals = np.array([vert.normal for vert in self.verts], dtype=np.float64).reshape(-1, 3)
+        self.setup(indices, co, normals, edges)
 
-        class NeighborData:
-            def __init__(self, vert, others):
-                self.vert = vert
-                self.others = others
-                self.disp_vec = Vector()
-
-            def update_vec(self):
-                self.disp_vec *= 0
-                for other in self.others:
-                    self.disp_vec += other.co
-                self.disp_vec /= len(self.others)
-                self.disp_vec = self.vert.co - self.disp_vec
-                self.disp_vec -= self.vert.normal.dot(self.disp_vec) * self.vert.normal
-
-        self.boundary_mapping = {}
-        for vert in bm.verts:
-            if vert.is_boundary:
-                others = []
-                for other in (edge.other_vert(vert) for edge in vert.link_edges if edge.is_boundary):
-                    if other.is_boundary:
-                        others.append(other)
-                self.boundary_mapping[vert] = NeighborData(vert, others)
-
-        self.original_coords = [vert.co.copy() for vert in self.boundary_mapping.keys()]
+    @classmethod
+    def from_arrays(cls, co, normals, boundary_edges):
+        self = cls.__new__(cls)
+        self.verts = None
+        indices = np.unique(boundary_edges)
+        self.setup(indices, co[indices], normals[indices], boundary_edges)
+        return self
+
+    @classmethod
+    def from_mesh(cls, mesh, normals=None):
+        arrays = MeshArrays(mesh)
+        if normals is None:
+            normals = arrays.normals
+        return cls.from_arrays(arrays.co, normals, arrays.boundary_edges)
+
+    def setup(self, indices, co, normals, edges):
+        self.indices = indices
+        self.co = co.astype(np.float64)
+        self.original_coords = self.co.copy()
+        self.normals = normals.astype(np.float64)
+        self.normals /= np.maximum(np.linalg.norm(self.normals, axis=1), 1e-12)[:, None]
+        self.adjacency = adjacency_matrix(np.searchsorted(indices, edges), len(indices), dtype=np.float64)
+        self.mean = mean_matrix(self.adjacency)
+
+    def to_bm(self):
+        if self.verts is not None:
+            for vert, co in zip(self.verts, self.co.tolist()):
+                vert.co = co
 
     def reset(self):
-        for vert, co in zip(self.boundary_mapping.keys(), self.original_coords):
-            vert.co.xyz = co.xyz
+        self.co[:] = self.original_coords
+        self.to_bm()
 
     def polish(self, iterations=30):
+        co = self.co
+        normals = self.normals
         for _ in range(iterations):
-            for dt in self.boundary_mapping.values():
-                dt.update_vec()
+            disp = co - self.mean @ co
+            disp -= (disp * normals).sum(axis=1)[:, None] * normals
+            co += (self.adjacency @ disp) * 0.125 - disp * 0.25
+        self.to_bm()
 
-            for vert, dt in self.boundary_mapping.items():
-                avg_vec = Vector()
-                avg_vec -= dt.disp_vec * 0.5
-                for other in dt.others:
-                    avg_vec += self.boundary_mapping[other].disp_vec * 0.25
-                vert.co += avg_vec * 0.5
+    def back_to_arrays(self, co):
+        co[self.indices] = self.co
+        return co
 
     def back_to_mesh(self, mesh):
-        for vert in self.boundary_mapping.keys():
-            mesh.vertices[vert.index].co = vert.co
+        write_coords(mesh, self.back_to_arrays(read_coords(mesh)))
+
+
+class ShellExtrusion:
+    # Turns an extracted shell into a solid straight from arrays. Vertices are
+    # offset along their normals by thickness * mask, so partially masked
+    # borders taper off, the open boundary is stitched with a rim of quads and
+    # the result gets a few Laplacian smoothing steps. With a source
+    # (attributes, vert_index, loop_index, face_index, edges, groups, weights,
+    # shape_keys) mapping the shell back to the mesh it was cut from, its
+    # data is carried over onto the result.
+    smooth_iterations = 5
+
+    def __init__(self, co, normals, mask, loop_start, loop_total, loop_verts, source=None):
+        n = len(co)
+        self.co = co.astype(np.float64)
+        self.normals = normals.astype(np.float64)
+        self.normals /= np.maximum(np.linalg.norm(self.normals, axis=1), 1e-12)[:, None]
+        self.mask = mask.astype(np.float64)
+
+        edges, loop_edges, counts = polygon_edges(loop_start, loop_total, loop_verts)
+        boundary = counts[loop_edges] == 1
+        a = loop_verts[boundary]
+        b = loop_verts[loop_next(loop_start, loop_total)][boundary]
+
+        # The offset side keeps the winding, the base side is flipped and the
+        # rim quads run against both so the solid stays consistently oriented.
+        face_end = np.repeat(loop_start + loop_total - 1, loop_total)
+        flipped = loop_verts[face_end - (np.arange(len(loop_verts)) - np.repeat(loop_start, loop_total))]
+        rim = np.column_stack((a, b, b + n, a + n)).ravel()
+
+        # The vertex, corner and face of the shell every element comes from.
+        face_order = face_end - (np.arange(len(loop_verts)) - np.repeat(loop_start, loop_total))
+        rim_loops = np.flatnonzero(boundary)
+        rim_next = loop_next(loop_start, loop_total)[rim_loops]
+        loop_face = np.repeat(np.arange(len(loop_start)), loop_total)
+        self.sources = {
+            False: (np.arange(n), np.arange(len(loop_verts)), np.arange(len(loop_start))),
+            True: (np.tile(np.arange(n), 2),
+                   np.concatenate((face_order, np.arange(len(loop_verts)),
+                                   np.column_stack((rim_loops, rim_next, rim_next, rim_loops)).ravel())),
+                   np.concatenate((np.arange(len(loop_start)), np.arange(len(loop_start)), loop_face[rim_loops]))),
+        }
+        self.source = source
+
+        self.topology = {
+            False: (loop_total, loop_verts, edges),
+            True: (np.concatenate((loop_total, loop_total, np.full(len(a), 4, dtype=np.int32))),
+                   np.concatenate((flipped, loop_verts + n, rim)),
+                   np.concatenate((edges, edges + n, np.column_stack((a, a + n))))),
+        }
+        self.rim_count = len(a)
+        self._means = {}
+        self._key = None
+        self._unsmoothed = None
+
+    def mean(self, solid):
+        if solid not in self._means:
+            edges = self.topology[solid][2]
+            self._means[solid] = mean_matrix(adjacency_matrix(edges, len(self.co) * (2 if solid else 1),
+                                                              dtype=np.float64))
+        return self._means[solid]
+
+    def coords(self, thickness=0, smooth=0, displace=0, solid=True):
+        # Displace and thickness only change when their stage is edited, so
+        # the unsmoothed result is cached for the smoothing stage.
+        key = (thickness, displace, solid)
+        if key != self._key:
+            # Half the strength, like a DISPLACE modifier at its default midlevel.
+            co = self.co + self.normals * (displace * 0.5)
+            if solid:
+                co = np.concatenate((co, co + self.normals * (thickness * self.mask)[:, None]))
+            self._key = key
+            self._unsmoothed = co
+
+        co = self._unsmoothed
+        if smooth > 0:
+            mean = self.mean(solid)
+            co = co.copy()
+            for _ in range(self.smooth_iterations):
+                co += (mean @ co - co) * smooth
+        return co
+
+    def to_mesh(self, name, face_smooth, thickness=0, smooth=0, displace=0, solid=True):
+        loop_total, loop_verts = self.topology[solid][:2]
+        loop_start = np.zeros(len(loop_total), dtype=np.int32)
+        np.cumsum(loop_total[:-1], out=loop_start[1:])
+        mesh = mesh_from_arrays(name, self.coords(thickness, smooth, displace, solid), loop_start, loop_total, loop_verts)
+        if self.source is not None:
+            attributes, vert_index, loop_index, face_index, edges = self.source[:5]
+            point, corner, face = self.sources[solid]
+            edge_index = edge_source_index(read_edges(mesh), edges, vert_index[point])
+            write_attributes(mesh, attributes, vert_index[point], loop_index[corner], face_index[face], edge_index)
+        if solid:
+            face_smooth = np.concatenate((face_smooth, face_smooth, np.ones(self.rim_count, dtype=bool)))
+        mesh.polygons.foreach_set('use_smooth', face_smooth)
+        write_mask(mesh, np.tile(self.mask, 2) if solid else self.mask)
+        return mesh
+
+    def write_object_data(self, ob, solid=True):
+        # Vertex groups and shape keys live on the object, they are added once
+        # the final mesh is in place.
+        if self.source is not None:
+            vert_index, groups, weights, shape_keys = self.source[1], *self.source[5:]
+            point_index = vert_index[self.sources[solid][0]]
+            write_vertex_groups(ob, groups, weights, point_index)
+            write_shape_keys(ob, shape_keys, point_index)
+
+
+class ThrottledPreview:
+    # Coalesces values coming from a modal operator and hands them to the
+    # update callback at most once per frame budget, or once per measured
+    # update cost if that is longer.
+    def __init__(self, update, values, budget=1 / 30):
+        self.update = update
+        self.values = dict(values)
+        self.budget = budget
+        self.cost = 0
+        self.last_update = 0
+        self.pending = {}
+
+    def set(self, name, value):
+        self.pending[name] = value
+
+    def flush(self, force=False):
+        now = time.perf_counter()
+        if not self.pending or (not force and now - self.last_update < max(self.budget, self.cost)):
+            return False
+
+        self.values.update(self.pending)
+        self.pending.clear()
+        self.update(**self.values)
+        self.last_update = time.perf_counter()
+        self.cost = self.last_update - now
+        return True
 
 
 @register_class
@@ -118,65 +267,101 @@ class MaskExtract(bpy.types.Operator):
     bl_label = 'Extract Mask'
     bl_description = 'Extract and solidify Masked region as a new object'
     bl_options = {'REGISTER'}
-    obj = None
-    solidify = None
-    smooth = None
+    shells = None
     polish_iterations = 5
     last_mouse = 0
     click_count = 0
 
+    separate_islands: bpy.props.BoolProperty(
+        name='Separate Islands',
+        description='Extract each connected masked region as its own object',
+        default=False,
+        options={'SKIP_SAVE'}
+    )
+
     @classmethod
     def poll(cls, context):
         if context.active_object:
             return context.active_object.type == 'MESH'
 
+    def create_shell(self, context, source, arrays, faces, data):
+        shell = Submesh.from_arrays(arrays, faces)
+        shell.remove_loops(shell.vert_face_count()[shell.loop_verts] == 1)
+
+        co = arrays.co[shell.vert_index]
+        normals = arrays.normals[shell.vert_index]
+        edges, loop_edges, counts = polygon_edges(shell.loop_start, shell.loop_total, shell.loop_verts)
+        polish = BoundaryPolish.from_arrays(co, normals, edges[counts == 1])
+        polish.polish(iterations=50)
+
+        attributes, groups, weights, shape_keys, use_smooth = data
+        extrusion = ShellExtrusion(polish.back_to_arrays(co.astype(np.float64)), normals,
+                                   arrays.mask[shell.vert_index],
+                                   shell.loop_start, shell.loop_total, shell.loop_verts,
+                                   (attributes, shell.vert_index, shell.loop_index, shell.face_index, arrays.edges,
+                                    groups, weights, shape_keys))
+        face_smooth = use_smooth[shell.face_index]
+        mesh = extrusion.to_mesh(source.name + '_Shell', face_smooth)
+        for material in source.data.materials:
+            mesh.materials.append(material)
+
+        obj = create_object_from_mesh(mesh, source.matrix_world, source.name + '_Shell')
+        obj.select_set(True)
+        return obj, extrusion, face_smooth
+
     def execute(self, context):
         self.last_mode = context.active_object.mode
         self.click_count = 0
         bpy.ops.object.mode_set(mode='OBJECT')
-        bm, mask = get_bm_and_mask(context.active_object.data)
+        source = context.active_object
+        arrays = MeshArrays(source.data)
+        masked = arrays.face_mask >= 0.5
+        if not masked.any():
+            self.report(type={'ERROR'}, message='Object does not contain any mask')
+            return {'CANCELLED'}
 
         self.slider = VerticalSlider(center=None)
         self.slider.setup_handler()
 
-        for face in bm.faces:
-            avg = sum(vert[mask] for vert in face.verts) / len(face.verts)
-            if avg < 0.5:
-                bm.faces.remove(face)
-        remove = []
-        dissolve = []
-        for vert in bm.verts:
-            if len(vert.link_faces) < 1:
-                remove.append(vert)
-            elif len(vert.link_faces) == 1:
-                dissolve.append(vert)
-        for vert in remove:
-            bm.verts.remove(vert)
-
-        bmesh.ops.dissolve_verts(bm, verts=dissolve)
-
-        BoundaryPolish(bm).polish(iterations=50)
-        # boundary_loops_create(bm, loops=1, smoothing=6)
-
-        self.obj = create_object_from_bm(bm,
-                                         context.active_object.matrix_world,
-                                         context.active_object.name + '_Shell')
-        self.bm = bm
-        self.obj.select_set(True)
-        context.view_layer.objects.active = self.obj
-
-        self.displace = self.obj.modifiers.new(type='DISPLACE', name='DISPLACE')
-        self.displace.strength = 0
-        self.solidify = self.obj.modifiers.new(type='SOLIDIFY', name='Solidify')
-        self.solidify.offset = 1
-        self.solidify.thickness = 0
-        self.smooth = self.obj.modifiers.new(type='SMOOTH', name='SMOOTH')
-        self.smooth.iterations = 5
-        self.smooth.factor = 0
+        if self.separate_islands:
+            islands = Submesh.from_arrays(arrays, masked).islands(arrays.loop_edges)
+        else:
+            islands = [masked]
+
+        data = (read_attributes(source.data, edges=True), [group.name for group in source.vertex_groups],
+                vertex_group_weights(source), read_shape_keys(source.data),
+                read_polygon_attribute(source.data, 'use_smooth', bool))
+        self.shells = [self.create_shell(context, source, arrays, faces, data) for faces in islands]
+        context.view_layer.objects.active = self.shells[0][0]
 
+        self.preview = ThrottledPreview(self.update_shells, {'thickness': 0, 'smooth': 0, 'displace': 0})
+        self.timer = context.window_manager.event_timer_add(self.preview.budget, window=context.window)
         context.window_manager.modal_handler_add(self)
         return {'RUNNING_MODAL'}
 
+    def update_shells(self, **values):
+        for ob, extrusion, _ in self.shells:
+            write_coords(ob.data, extrusion.coords(**values))
+
+    def finish(self, context):
+        self.preview.flush(force=True)
+        context.window_manager.event_timer_remove(self.timer)
+
+        values = self.preview.values
+        solid = values['thickness'] > 0
+        for ob, extrusion, face_smooth in self.shells:
+            if not solid:
+                # Without thickness the shell stays a single surface.
+                mesh = ob.data
+                ob.data = extrusion.to_mesh(mesh.name, face_smooth, solid=False, **values)
+                for material in mesh.materials:
+                    ob.data.materials.append(material)
+                bpy.data.meshes.remove(mesh)
+            extrusion.write_object_data(ob, solid)
+
+        context.view_layer.objects.active = self.shells[0][0]
+        self.slider.remove_handler()
+
     def modal(self, context, event):
 
         mouse_co = Vector((event.mouse_region_x, event.mouse_region_y))
@@ -187,43 +372,35 @@ class MaskExtract(bpy.types.Operator):
 
         if event.type == 'LEFTMOUSE' and event.value == 'PRESS':
             self.click_count += 1
+            self.preview.flush(force=True)
         elif event.type in {'ESC', 'RIGHTMOUSE'}:
             self.click_count = 4
 
-        if event.type == 'MOUSEMOVE':
+        if self.click_count >= 3:
+            self.finish(context)
+            return {'FINISHED'}
 
-            delta = self.last_mouse - event.mouse_y
+        if event.type == 'MOUSEMOVE':
             self.last_mouse = event.mouse_y
             if self.click_count == 0:
                 scale = 700 / dist if not event.shift else 1400 / dist
-                self.solidify.thickness = self.slider.eval(mouse_co, 'Thickness', unit_scale=scale)
-                self.solidify.thickness = max(self.solidify.thickness, 0)
+                thickness = self.slider.eval(mouse_co, 'Thickness', unit_scale=scale)
+                self.preview.set('thickness', max(thickness, 0))
 
             elif self.click_count == 1:
                 scale = 100 if not event.shift else 300
-                self.smooth.factor = self.slider.eval(mouse_co, 'Smooth', unit_scale=scale)
-                self.smooth.factor = max(self.smooth.factor, 0)
+                factor = self.slider.eval(mouse_co, 'Smooth', unit_scale=scale)
+                self.preview.set('smooth', max(factor, 0))
 
             elif self.click_count == 2:
                 scale = 700 / dist if not event.shift else 1400 / dist
-                self.displace.strength = self.slider.eval(mouse_co, 'Displace', unit_scale=scale)
-
-            elif self.click_count >= 3:
-                if self.displace.strength != 0:
-                    bpy.ops.object.modifier_apply(modifier=self.displace.name)
-                else:
-                    self.obj.modifiers.remove(self.displace)
-                if self.solidify.thickness > 0:
-                    bpy.ops.object.modifier_apply(modifier=self.solidify.name)
-                else:
-                    self.obj.modifiers.remove(self.solidify)
-                if self.smooth.factor > 0:
-                    bpy.ops.object.modifier_apply(modifier=self.smooth.name)
-                else:
-                    self.obj.modifiers.remove(self.smooth)
-                self.bm.free()
-                self.slider.remove_handler()
-                return {'FINISHED'}
+                strength = self.slider.eval(mouse_co, 'Displace', unit_scale=scale)
+                self.preview.set('displace', strength)
+
+            self.preview.flush()
+
+        elif event.type == 'TIMER':
+            self.preview.flush()
 
         return {'RUNNING_MODAL'}
 
@@ -243,6 +420,12 @@ class MaskSplit(bpy.types.Operator):
         default='BOTH'
     )
 
+    cap: bpy.props.EnumProperty(
+        name='Cap',
+        items=CAP_METHODS,
+        default='TRIANGULATE'
+    )
+
     @classmethod
     def poll(cls, context):
         return context.active_object and context.active_object.type == 'MESH'
@@ -252,54 +435,116 @@ class MaskSplit(bpy.types.Operator):
         bpy.ops.object.mode_set(mode='OBJECT')
         return context.window_manager.invoke_props_dialog(self)
 
-    def remove_half(self, bm, invert=False):
-        for face in bm.faces:
-            if (face.select and not invert) or (not face.select and invert):
-                bm.faces.remove(face)
-        for vert in bm.verts:
-            if len(vert.link_faces) == 0:
-                bm.verts.remove(vert)
-        bmesh.ops.holes_fill(bm, edges=bm.edges)
-        bmesh.ops.triangulate(bm, faces=[face for face in bm.faces if len(face.verts) > 4])
-
     def execute(self, context):
         ob = context.active_object
-        bm, mask = get_bm_and_mask(ob.data)
-        bm.faces.ensure_lookup_table()
-        face_mask = []
-
-        for face in bm.faces:
-            mask_sum = 0
-            for vert in face.verts:
-                mask_sum += vert[mask]
-            face_mask.append(mask_sum / len(face.verts))
-
-        geom1 = []
-
-        for face in bm.faces:
-            if face_mask[face.index] > 0.5:
-                geom1.append(face)
-                face.select = True
-            else:
-                face.select = False
+        arrays = MeshArrays(ob.data)
+        masked = arrays.face_mask > 0.5
+
+        sides = {'MASKED': [masked],
+                 'UNMASKED': [~masked],
+                 'BOTH': [~masked, masked]}[self.keep]
+
+        groups = [group.name for group in ob.vertex_groups]
+        weights = vertex_group_weights(ob)
+        shape_keys = read_shape_keys(ob.data)
+        attributes = read_attributes(ob.data, edges=True)
+
+        meshes = []
+        point_indices = []
+        for faces in sides:
+            part = Submesh.from_arrays(arrays, faces)
+            mesh = part.to_mesh(arrays, ob.data.name, attributes=attributes)
+            fill_holes(mesh, self.cap)
+            # Cap vertices have no source vertex.
+            point_index = np.full(len(mesh.vertices), -1)
+            point_index[:len(part.vert_index)] = part.vert_index
+            meshes.append(mesh)
+            point_indices.append(point_index)
+
+        old_mesh = ob.data
+        ob.data = meshes[0]
+        objects = [ob]
+        if len(meshes) > 1:
+            other = ob.copy()
+            other.data = meshes[1]
+            for collection in ob.users_collection:
+                collection.objects.link(other)
+            objects.append(other)
+
+        for target, point_index in zip(objects, point_indices):
+            write_vertex_groups(target, groups, weights, point_index)
+            write_shape_keys(target, shape_keys, point_index)
+
+        if old_mesh.users == 0:
+            name = old_mesh.name
+            bpy.data.meshes.remove(old_mesh)
+            meshes[0].name = name
 
-        bm1 = bm.copy()
+        return {'FINISHED'}
 
-        invert = False
-        if self.keep == 'MASKED':
-            invert = True
 
-        self.remove_half(bm, invert=invert)
-        bm.to_mesh(ob.data)
+class DeformRigTemplates:
+    # The mask deform rig is appended from DEFORM_RIG_PATH once per session and
+    # kept as unlinked template objects. New rigs are in memory copies of them.
+    names = ('Lattice', 'DeformPivot', 'DeformManipulator')
+    prefix = '.MaskDeformTemplate '
+    objects = []
 
-        if self.keep == 'BOTH':
-            bpy.ops.object.duplicate()
-            self.remove_half(bm1, invert=True)
-            bm1.to_mesh(context.active_object.data)
-            self.remove_half(bm)
-            bm.to_mesh(ob.data)
+    @staticmethod
+    def is_valid(ob):
+        try:
+            return bpy.data.objects.get(ob.name) == ob
+        except ReferenceError:
+            return False
 
-        return {'FINISHED'}
+    @classmethod
+    def get(cls):
+        if len(cls.objects) == len(cls.names) and all(cls.is_valid(ob) for ob in cls.objects):
+            return cls.objects
+
+        # After an undo or file load the old references are gone, but the
+        # templates may still be around under their names.
+        found = [bpy.data.objects.get(cls.prefix + name) for name in cls.names]
+        if all(found):
+            cls.objects = found
+            return cls.objects
+
+        with bpy.data.libraries.load(DEFORM_RIG_PATH) as (data_from, data_to):
+            data_to.objects = list(cls.names)
+        for name, ob in zip(cls.names, data_to.objects):
+            ob.name = cls.prefix + name
+        cls.objects = list(data_to.objects)
+        return cls.objects
+
+    @classmethod
+    def instantiate(cls, collection):
+        templates = cls.get()
+        copies = [ob.copy() for ob in templates]
+        remap = {template.as_pointer(): copy for template, copy in zip(templates, copies)}
+
+        def remapped(id_data):
+            if id_data is None:
+                return None
+            return remap.get(id_data.as_pointer(), id_data)
+
+        # Copies still point at the templates, hook them up to each other.
+        for name, ob in zip(cls.names, copies):
+            ob.name = name
+            ob.parent = remapped(ob.parent)
+            for constraint in ob.constraints:
+                if hasattr(constraint, 'target'):
+                    constraint.target = remapped(constraint.target)
+            for md in ob.modifiers:
+                if hasattr(md, 'object'):
+                    md.object = remapped(md.object)
+            if ob.animation_data:
+                for fcurve in ob.animation_data.drivers:
+                    for variable in fcurve.driver.variables:
+                        for target in variable.targets:
+                            if isinstance(target.id, bpy.types.Object):
+                                target.id = remapped(target.id)
+            collection.objects.link(ob)
+        return copies
 
 
 @register_class
@@ -342,6 +587,28 @@ class MaskDeformRemove(bpy.types.Operator):
         return {'FINISHED'}
 
 
+class SoftTransform:
+    # Captures the masked vertices once and moves only those, blending the
+    # manipulator transform by their mask weight. The full coordinate buffer
+    # is kept around so a frame only touches the masked rows before writing.
+    def __init__(self, ob, arrays):
+        self.ob = ob
+        self.co = arrays.co
+        self.indices = np.flatnonzero(arrays.mask > 0)
+        self.weights = arrays.mask[self.indices, None].astype(np.float64)
+        self.rest = self.co[self.indices].astype(np.float64)
+
+    def apply(self, matrix):
+        matrix = np.array(matrix, dtype=np.float64)
+        moved = self.rest @ matrix[:3, :3].T + matrix[:3, 3]
+        self.co[self.indices] = self.rest + (moved - self.rest) * self.weights
+        write_coords(self.ob.data, self.co)
+
+    def reset(self):
+        self.co[self.indices] = self.rest
+        write_coords(self.ob.data, self.co)
+
+
 @register_class
 class MaskDeformAdd(bpy.types.Operator):
     bl_idname = 'sculpt_tool_kit.mask_deform_add'
@@ -349,6 +616,14 @@ class MaskDeformAdd(bpy.types.Operator):
     bl_description = 'Add a rig to deform masked region'
     bl_options = {'REGISTER', 'UNDO'}
 
+    deform_mode: bpy.props.EnumProperty(
+        name='Mode',
+        items=(('LATTICE', 'Lattice', 'Deform through a lattice rig'),
+               ('TRANSFORM', 'Soft Transform', 'Move the masked vertices directly with an empty')),
+        default='LATTICE',
+        options={'SKIP_SAVE'}
+    )
+
     @classmethod
     def poll(cls, context):
         if context.active_object:
@@ -358,55 +633,63 @@ class MaskDeformAdd(bpy.types.Operator):
 
         md = ob.modifiers.new(type='LATTICE', name='MASK_DEFORM')
         md.vertex_group = vg.name
-        with bpy.types.BlendDataLibraries.load(DEFORM_RIG_PATH) as (data_from, data_to):
-            data_to.objects = ['Lattice', 'DeformPivot', 'DeformManipulator']
-        for d_ob in data_to.objects:
-            context.collection.objects.link(d_ob)
-        md.object = data_to.objects[0]
-        data_to.objects[0].hide_viewport = True
-        data_to.objects[1].location = location
-        data_to.objects[1].scale = (radius,) * 3
-        ob['MASK_RIG'] = list(data_to.objects) + [md.name]
+        rig = DeformRigTemplates.instantiate(context.collection)
+        md.object = rig[0]
+        rig[0].hide_viewport = True
+        rig[1].location = location
+        rig[1].scale = (radius,) * 3
+        ob['MASK_RIG'] = rig + [md.name]
+
+    def create_manipulator(self, context, location, radius=1):
+        manipulator = bpy.data.objects.new('MaskTransform', None)
+        manipulator.empty_display_type = 'SPHERE'
+        manipulator.location = location
+        manipulator.scale = (radius,) * 3
+        context.collection.objects.link(manipulator)
+        # matrix_world stays the identity until the depsgraph evaluates the
+        # empty, the follower takes its rest matrix from it.
+        context.view_layer.update()
+        self.ob.select_set(False)
+        manipulator.select_set(True)
+        context.view_layer.objects.active = manipulator
+        return manipulator
 
     def execute(self, context):
         bpy.ops.object.mode_set(mode='OBJECT')
         self.ob = context.active_object
-        bm, mask = get_bm_and_mask(self.ob.data)
-        vg = self.ob.vertex_groups.new(name='MASK_TO_VG')
-        avg_location = Vector()
-        total = 0
-        for vert in bm.verts:
-            vg.add([vert.index], weight=vert[mask], type='REPLACE')
-            f = vert[mask]
-            f = max(0, f * (1 - f)) + 0.001 * f
-            avg_location += vert.co * f
-            total += f
-        radius = 0
-
-        try:
-            avg_location /= total
-            for vert in bm.verts:
-                f = vert[mask]
-                f = max(0, f * (1 - f)) + 0.001 * f
-                radius += (vert.co - avg_location).length * f
-            radius /= total
-            radius *= sum(self.ob.scale) / 3 * 1.5
-            avg_location = self.ob.matrix_world @ avg_location
-            self.create_rig(context, self.ob, vg, avg_location, radius)
-            self.draw_callback_px = Draw2D()
-            self.draw_callback_px.setup_handler()
-            self.draw_callback_px.add_text('[Return] = Finish, [ESC] = Cancell',
-                                           location=Vector((50, 50)),
-                                           size=15,
-                                           color=(1, 0.5, 0, 1))
-            context.window_manager.modal_handler_add(self)
-            return {'RUNNING_MODAL'}
-
-        except ZeroDivisionError:
+        arrays = MeshArrays(self.ob.data)
+        stats = mask_statistics(self.ob, arrays)
+        if stats['weight'] <= 0:
             self.report(type={'ERROR'}, message='Object does not contain any mask')
             return {'CANCELLED'}
 
+        radius = stats['radius'] * sum(self.ob.scale) / 3 * 1.5
+        avg_location = self.ob.matrix_world @ Vector(stats['centroid'])
+
+        if self.deform_mode == 'TRANSFORM':
+            self.soft_transform = SoftTransform(self.ob, arrays)
+            self.manipulator = self.create_manipulator(context, avg_location, radius)
+            # The transform operator consumes events while the empty is being
+            # dragged, so the vertices follow it from an app timer instead.
+            self.follow_manipulator = self.manipulator_follower()
+            bpy.app.timers.register(self.follow_manipulator)
+        else:
+            vg = weights_to_vertex_group(self.ob.vertex_groups.new(name='MASK_TO_VG'), arrays.mask)
+            self.create_rig(context, self.ob, vg, avg_location, radius)
+
+        self.draw_callback_px = Draw2D()
+        self.draw_callback_px.setup_handler()
+        self.draw_callback_px.add_text('[Return] = Finish, [ESC] = Cancell',
+                                       location=Vector((50, 50)),
+                                       size=15,
+                                       color=(1, 0.5, 0, 1))
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
     def modal(self, context, event):
+        if self.deform_mode == 'TRANSFORM':
+            return self.modal_transform(context, event)
+
         if event.type == 'RET':
             if self.remove_rig(context, apply=True):
                 self.draw_callback_px.remove_handler()
@@ -419,6 +702,44 @@ class MaskDeformAdd(bpy.types.Operator):
 
         return {'PASS_THROUGH'}
 
+    def manipulator_follower(self):
+        # The timer only holds what it needs, never the operator itself, which
+        # is freed as soon as the modal finishes.
+        ob = self.ob
+        manipulator = self.manipulator
+        soft_transform = self.soft_transform
+        rest_inverted = manipulator.matrix_world.inverted()
+        last_matrix = [manipulator.matrix_world.copy()]
+
+        def follow():
+            try:
+                matrix = manipulator.matrix_world
+            except ReferenceError:
+                return None
+            if matrix != last_matrix[0]:
+                last_matrix[0] = matrix.copy()
+                mw = ob.matrix_world
+                soft_transform.apply(mw.inverted() @ matrix @ rest_inverted @ mw)
+            return 1 / 30
+
+        return follow
+
+    def modal_transform(self, context, event):
+        if event.type in {'RET', 'ESC'}:
+            if event.type == 'ESC':
+                self.soft_transform.reset()
+            else:
+                self.follow_manipulator()
+            if bpy.app.timers.is_registered(self.follow_manipulator):
+                bpy.app.timers.unregister(self.follow_manipulator)
+            bpy.data.objects.remove(self.manipulator)
+            self.ob.select_set(True)
+            context.view_layer.objects.active = self.ob
+            self.draw_callback_px.remove_handler()
+            return {'FINISHED'} if event.type == 'RET' else {'CANCELLED'}
+
+        return {'PASS_THROUGH'}
+
     def remove_rig(self, context, apply):
         context.view_layer.objects.active = self.ob
         self.ob.select_set(True)
@@ -426,7 +747,6 @@ class MaskDeformAdd(bpy.types.Operator):
         return True
 
 
-
 @register_class
 class MaskDecimate(bpy.types.Operator):
     bl_idname = 'sculpt_tool_kit.mask_decimate'
@@ -446,24 +766,12 @@ class MaskDecimate(bpy.types.Operator):
             return context.active_object.type == 'MESH'
 
     def invoke(self, context, event):
-        bpy.ops.object.mode_set(mode='OBJECT')
         bpy.ops.ed.undo_push()
         return context.window_manager.invoke_props_dialog(self)
 
     def execute(self, context):
-        bpy.ops.object.mode_set(mode='OBJECT')
         bpy.ops.ed.undo_push()
         ob = context.active_object
-        vg = ob.vertex_groups.new(name='DECIMATION_VG')
-
-        bm, mask = get_bm_and_mask(ob.data)
-        for vert in bm.verts:
-            vg.add([vert.index], weight=vert[mask], type='REPLACE')
-        ob.vertex_groups.active_index = vg.index
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='SELECT')
-        bpy.ops.mesh.decimate(ratio=self.ratio, use_vertex_group=True, vertex_group_factor=10)
-        bpy.ops.object.mode_set(mode='OBJECT')
-        ob.vertex_groups.remove(vg)
+        decimate_object(ob, self.ratio, mask_factor=MASK_FACTOR)
         context.area.tag_redraw()
         return {'FINISHED'}
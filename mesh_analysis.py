@@ -0,0 +1,145 @@
+import numpy as np
+from collections import OrderedDict
+from .mesh_arrays import MeshArrays, geometry_fingerprint, loop_next
+
+
+def tangent_frames(normals):
+    # Two unit vectors spanning the plane perpendicular to every normal.
+    helper = np.zeros_like(normals)
+    helper[:, 0] = 1
+    helper[np.abs(normals[:, 0]) > 0.9] = (0, 1, 0)
+    u = np.cross(normals, helper)
+    u /= np.maximum(np.linalg.norm(u, axis=1), 1e-12)[:, None]
+    return u, np.cross(normals, u)
+
+
+def solve_symmetric3(a, b, c, d, e, f, x, y, z):
+    # Solves [[a, b, c], [b, d, e], [c, e, f]] @ s = (x, y, z) for stacks of
+    # systems through the adjugate, singular systems give zeros.
+    c00 = d * f - e * e
+    c01 = c * e - b * f
+    c02 = b * e - c * d
+    c11 = a * f - c * c
+    c12 = b * c - a * e
+    c22 = a * d - b * b
+    det = a * c00 + b * c01 + c * c02
+    inv = np.divide(1, det, out=np.zeros_like(det), where=np.abs(det) > 1e-30)
+    return ((c00 * x + c01 * y + c02 * z) * inv,
+            (c01 * x + c11 * y + c12 * z) * inv,
+            (c02 * x + c12 * y + c22 * z) * inv)
+
+
+def curvature_tensors(co, normals, edges):
+    # Least squares fit of a 2x2 shape operator [[a, b], [b, c]] in each
+    # vertex tangent plane, mapping the direction of every edge to the change
+    # of normal along it. Each edge gives two equations, so even the two edge
+    # directions of a regular quad grid determine all three entries.
+    count = len(co)
+    u, v = tangent_frames(normals)
+    verts = edges.ravel()
+    other = edges[:, ::-1].ravel()
+    d = co[other] - co[verts]
+    dn = normals[other] - normals[verts]
+    scale = 1 / np.maximum(np.linalg.norm(d, axis=1), 1e-12)
+    du = u[verts]
+    dv = v[verts]
+    x = (d * du).sum(axis=1) * scale
+    y = (d * dv).sum(axis=1) * scale
+    nx = (dn * du).sum(axis=1) * scale
+    ny = (dn * dv).sum(axis=1) * scale
+
+    def sums(weights):
+        return np.bincount(verts, weights=weights, minlength=count)
+
+    xx = sums(x * x)
+    xy = sums(x * y)
+    yy = sums(y * y)
+    # A small ridge keeps vertices with a single edge direction solvable.
+    ridge = 1e-6 * (xx + yy) + 1e-12
+    a, b, c = solve_symmetric3(xx + ridge, xy, np.zeros(count), xx + yy + ridge, xy, yy + ridge,
+                               sums(x * nx), sums(y * nx + x * ny), sums(y * ny))
+    return a, b, c, u, v
+
+
+class MeshAnalysis:
+    # Per element measures of a mesh computed together from its arrays:
+    #   edge_lengths          per edge
+    #   face_areas, face_aspect (longest over shortest edge, 1 for regular faces)
+    #   mean_curvature, max_curvature, min_curvature (signed, largest magnitude
+    #   first) and principal_direction (unit, along max_curvature) per vertex
+    # get() keeps the last result for every mesh against a fingerprint of its
+    # coordinates and face count, so tools asking for the same mesh share it.
+    # Least recently used results are dropped once they pass budget, the
+    # reprojection handlers clear them when a file is loaded.
+    entries = OrderedDict()
+    budget = 256 * 2 ** 20
+
+    def __init__(self, arrays):
+        co = arrays.co.astype(np.float64)
+        normals = arrays.normals.astype(np.float64)
+        edges = arrays.edges.astype(np.int64)
+        loop_start, loop_total, loop_verts = arrays.polygons
+
+        vectors = co[edges[:, 1]] - co[edges[:, 0]]
+        self.edge_lengths = np.linalg.norm(vectors, axis=1)
+
+        if len(loop_start):
+            p = co[loop_verts]
+            q = co[loop_verts[loop_next(loop_start, loop_total)]]
+            cross = np.cross(p, q)
+            owner = np.repeat(np.arange(len(loop_start)), loop_total)
+            vector_area = np.column_stack([np.bincount(owner, weights=cross[:, i], minlength=len(loop_start))
+                                           for i in range(3)])
+            self.face_areas = np.linalg.norm(vector_area, axis=1) * 0.5
+            loop_lengths = self.edge_lengths[arrays.loop_edges]
+            longest = np.maximum.reduceat(loop_lengths, loop_start)
+            shortest = np.minimum.reduceat(loop_lengths, loop_start)
+            self.face_aspect = longest / np.maximum(shortest, 1e-12)
+        else:
+            self.face_areas = np.zeros(0)
+            self.face_aspect = np.zeros(0)
+
+        a, b, c, u, v = curvature_tensors(co, normals, edges)
+        self.mean_curvature = (a + c) * 0.5
+        radius = np.hypot((a - c) * 0.5, b)
+        larger = self.mean_curvature + radius
+        smaller = self.mean_curvature - radius
+        angle = 0.5 * np.arctan2(2 * b, a - c)
+        flip = np.abs(smaller) > np.abs(larger)
+        angle[flip] += np.pi / 2
+        self.max_curvature = np.where(flip, smaller, larger)
+        self.min_curvature = np.where(flip, larger, smaller)
+        self.principal_direction = np.cos(angle)[:, None] * u + np.sin(angle)[:, None] * v
+
+    @property
+    def nbytes(self):
+        return sum(value.nbytes for value in vars(self).values())
+
+    @property
+    def curvedness(self):
+        return np.sqrt((self.max_curvature ** 2 + self.min_curvature ** 2) * 0.5)
+
+    @classmethod
+    def get(cls, mesh_or_arrays):
+        arrays = mesh_or_arrays if isinstance(mesh_or_arrays, MeshArrays) else MeshArrays(mesh_or_arrays)
+        mesh = arrays.mesh
+        fingerprint = geometry_fingerprint(arrays.co, len(mesh.polygons))
+        key = mesh.as_pointer()
+        entry = cls.entries.get(key)
+        if entry is None or entry[0] != fingerprint:
+            analysis = cls(arrays)
+            entry = (fingerprint, analysis, analysis.nbytes)
+            cls.entries[key] = entry
+        cls.entries.move_to_end(key)
+        cls.evict()
+        return entry[1]
+
+    @classmethod
+    def evict(cls):
+        total = sum(entry[2] for entry in cls.entries.values())
+        while total > cls.budget and len(cls.entries) > 1:
+            total -= cls.entries.popitem(last=False)[1][2]
+
+    @classmethod
+    def clear(cls):
+        cls.entries.clear()
@@ -0,0 +1,580 @@
+import bpy
+import bmesh
+import zlib
+import numpy as np
+from .sparse_matrix import connected_components
+
+MASK_ATTRIBUTE = '.sculpt_mask'
+
+
+def mask_layer_get(mesh):
+    # Blender 4.1+ stores the mask as a generic attribute, older versions
+    # expose the CD_PAINT_MASK layer as vertex_paint_masks.
+    attributes = getattr(mesh, 'attributes', None)
+    if attributes is not None:
+        layer = attributes.get(MASK_ATTRIBUTE)
+        if layer is not None:
+            return layer.data
+
+    masks = getattr(mesh, 'vertex_paint_masks', None)
+    if masks:
+        return masks[0].data
+
+    return None
+
+
+def mask_layer_ensure(mesh):
+    data = mask_layer_get(mesh)
+    if data is not None:
+        return data
+
+    if bpy.app.version >= (4, 1, 0):
+        return mesh.attributes.new(MASK_ATTRIBUTE, 'FLOAT', 'POINT').data
+
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bm.verts.layers.paint_mask.verify()
+    bm.to_mesh(mesh)
+    bm.free()
+    return mask_layer_get(mesh)
+
+
+def _buffer(out, shape, dtype):
+    if out is not None and out.shape == shape and out.dtype == dtype:
+        return out
+    return np.empty(shape, dtype=dtype)
+
+
+def read_mask(mesh, out=None):
+    mask = _buffer(out, (len(mesh.vertices),), np.float32)
+    data = mask_layer_get(mesh)
+    if data is None:
+        mask.fill(0)
+    else:
+        data.foreach_get('value', mask)
+    return mask
+
+
+def write_mask(mesh, mask):
+    data = mask_layer_ensure(mesh)
+    data.foreach_set('value', np.ascontiguousarray(mask, dtype=np.float32))
+    mesh.update()
+
+
+def read_coords(mesh, out=None):
+    co = _buffer(out, (len(mesh.vertices), 3), np.float32)
+    mesh.vertices.foreach_get('co', co.ravel())
+    return co
+
+
+def write_coords(mesh, co):
+    mesh.vertices.foreach_set('co', np.ascontiguousarray(co, dtype=np.float32).ravel())
+    mesh.update()
+
+
+def read_normals(mesh, out=None):
+    no = _buffer(out, (len(mesh.vertices), 3), np.float32)
+    mesh.vertices.foreach_get('normal', no.ravel())
+    return no
+
+
+def read_polygons(mesh, loop_start=None, loop_total=None, loop_verts=None):
+    n_polys = len(mesh.polygons)
+    loop_start = _buffer(loop_start, (n_polys,), np.int32)
+    loop_total = _buffer(loop_total, (n_polys,), np.int32)
+    loop_verts = _buffer(loop_verts, (len(mesh.loops),), np.int32)
+    mesh.polygons.foreach_get('loop_start', loop_start)
+    mesh.polygons.foreach_get('loop_total', loop_total)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    return loop_start, loop_total, loop_verts
+
+
+def read_edges(mesh, out=None):
+    edges = _buffer(out, (len(mesh.edges), 2), np.int32)
+    mesh.edges.foreach_get('vertices', edges.ravel())
+    return edges
+
+
+def read_loop_edges(mesh, out=None):
+    loop_edges = _buffer(out, (len(mesh.loops),), np.int32)
+    mesh.loops.foreach_get('edge_index', loop_edges)
+    return loop_edges
+
+
+def edge_face_count(loop_edges, edge_count):
+    return np.bincount(loop_edges, minlength=edge_count)
+
+
+def read_polygon_attribute(mesh, name, dtype, out=None):
+    values = _buffer(out, (len(mesh.polygons),), dtype)
+    mesh.polygons.foreach_get(name, values)
+    return values
+
+
+def mesh_from_arrays(name, co, loop_start, loop_total, loop_verts):
+    mesh = bpy.data.meshes.new(name=name)
+    return mesh_write_arrays(mesh, co, loop_start, loop_total, loop_verts)
+
+
+def mesh_write_arrays(mesh, co, loop_start, loop_total, loop_verts):
+    # Fills an empty mesh (new, or after clear_geometry) in one write.
+    mesh.vertices.add(len(co))
+    mesh.loops.add(len(loop_verts))
+    mesh.polygons.add(len(loop_start))
+    mesh.vertices.foreach_set('co', np.ascontiguousarray(co, dtype=np.float32).ravel())
+    mesh.loops.foreach_set('vertex_index', np.ascontiguousarray(loop_verts, dtype=np.int32))
+    mesh.polygons.foreach_set('loop_start', np.ascontiguousarray(loop_start, dtype=np.int32))
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set('loop_total', np.ascontiguousarray(loop_total, dtype=np.int32))
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def loop_next(loop_start, loop_total):
+    loop_next = np.arange(1, loop_total.sum() + 1)
+    loop_next[loop_start + loop_total - 1] = loop_start
+    return loop_next
+
+
+def polygon_edges(loop_start, loop_total, loop_verts):
+    # Edges straight from the loop arrays: the unique (N, 2) edges, the edge of
+    # every loop and how many loops use each edge (1 on open boundaries).
+    a = loop_verts.astype(np.int64)
+    b = a[loop_next(loop_start, loop_total)]
+    stride = a.max() + 1 if len(a) else 1
+    keys = np.minimum(a, b) * stride + np.maximum(a, b)
+    keys, loop_edges, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    edges = np.column_stack((keys // stride, keys % stride)).astype(np.int32)
+    return edges, loop_edges.ravel(), counts
+
+
+def append_polygons(mesh, co, loop_total, loop_verts):
+    # Adds vertices and faces to a mesh in one write, loop_verts may refer to
+    # existing vertices as well as the new ones (numbered after them).
+    old_co = read_coords(mesh)
+    old_start, old_total, old_verts = read_polygons(mesh)
+    loop_start = np.zeros(len(loop_total), dtype=np.int32)
+    np.cumsum(loop_total[:-1], out=loop_start[1:])
+
+    mesh.vertices.add(len(co))
+    mesh.loops.add(len(loop_verts))
+    mesh.polygons.add(len(loop_total))
+    mesh.vertices.foreach_set('co', np.concatenate((old_co, co)).astype(np.float32).ravel())
+    mesh.loops.foreach_set('vertex_index', np.concatenate((old_verts, loop_verts)).astype(np.int32))
+    mesh.polygons.foreach_set('loop_start', np.concatenate((old_start, loop_start + len(old_verts))).astype(np.int32))
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set('loop_total', np.concatenate((old_total, loop_total)).astype(np.int32))
+    mesh.update(calc_edges=True)
+
+
+# foreach property, components and dtype of every generic attribute type.
+ATTRIBUTE_VALUES = {
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int32),
+    'BOOLEAN': ('value', 1, bool),
+    'FLOAT2': ('vector', 2, np.float32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32),
+    'INT32_2D': ('value', 2, np.int32),
+    'QUATERNION': ('value', 4, np.float32),
+}
+
+# Internal attributes are rebuilt from the topology, apart from these. The
+# polygon smooth and material properties are copied through RNA instead.
+KEPT_INTERNAL_ATTRIBUTES = {'.sculpt_face_set', MASK_ATTRIBUTE}
+SKIPPED_ATTRIBUTES = {'position', 'material_index', 'sharp_face'}
+POLYGON_PROPERTIES = (('use_smooth', bool), ('material_index', np.int32))
+POLYGON_DTYPES = dict(POLYGON_PROPERTIES)
+# Edge data that is RNA only in some versions (creases and bevel weights
+# became attributes in 4.0), read with the 'MESH_EDGE' domain.
+EDGE_PROPERTIES = (('use_seam', bool), ('use_edge_sharp', bool), ('crease', np.float32), ('bevel_weight', np.float32))
+EDGE_DTYPES = dict(EDGE_PROPERTIES)
+
+
+def read_attributes(mesh, edges=False):
+    # Snapshot of the point, corner and face data that survives a topology
+    # rewrite: (name, domain, data_type, values) with values shaped (n, width).
+    # UV maps only became generic attributes in 3.5, older ones are read from
+    # uv_layers with the 'UV' domain. Edge data is only read when asked for,
+    # writing it needs an edge_index.
+    domains = ('POINT', 'CORNER', 'FACE', 'EDGE') if edges else ('POINT', 'CORNER', 'FACE')
+    attributes = []
+    for attribute in getattr(mesh, 'attributes', ()):
+        name = attribute.name
+        if attribute.domain not in domains or attribute.data_type not in ATTRIBUTE_VALUES:
+            continue
+        if name in SKIPPED_ATTRIBUTES:
+            continue
+        if name.startswith('.') and name not in KEPT_INTERNAL_ATTRIBUTES:
+            continue
+        prop, width, dtype = ATTRIBUTE_VALUES[attribute.data_type]
+        values = np.empty(len(attribute.data) * width, dtype=dtype)
+        attribute.data.foreach_get(prop, values)
+        attributes.append((name, attribute.domain, attribute.data_type, values.reshape(-1, width)))
+
+    if bpy.app.version < (3, 5, 0):
+        for layer in mesh.uv_layers:
+            values = np.empty(len(layer.data) * 2, dtype=np.float32)
+            layer.data.foreach_get('uv', values)
+            attributes.append((layer.name, 'UV', 'FLOAT2', values.reshape(-1, 2)))
+
+    for prop, dtype in POLYGON_PROPERTIES:
+        attributes.append((prop, 'POLYGON', None, read_polygon_attribute(mesh, prop, dtype)))
+
+    if edges:
+        edge_props = bpy.types.MeshEdge.bl_rna.properties
+        for prop, dtype in EDGE_PROPERTIES:
+            if prop in edge_props:
+                values = np.empty(len(mesh.edges), dtype=dtype)
+                mesh.edges.foreach_get(prop, values)
+                attributes.append((prop, 'MESH_EDGE', None, values))
+    return attributes
+
+
+def write_attributes(mesh, attributes, point_index, corner_index, face_index, edge_index=None):
+    # Writes a read_attributes snapshot onto new topology, every element takes
+    # the values of the source element its index array points at, elements
+    # with a negative index get zeros.
+    index = {'POINT': point_index, 'CORNER': corner_index, 'UV': corner_index,
+             'FACE': face_index, 'POLYGON': face_index, 'EDGE': edge_index, 'MESH_EDGE': edge_index}
+    for name, domain, data_type, values in attributes:
+        source = index[domain]
+        if source is None:
+            continue
+        missing = source < 0
+        values = values[np.maximum(source, 0)]
+        if missing.any():
+            values[missing] = 0
+        write_attribute(mesh, name, domain, data_type, values)
+
+
+def write_attribute(mesh, name, domain, data_type, values):
+    # One read_attributes entry with values for every element of the mesh.
+    if domain == 'POLYGON':
+        mesh.polygons.foreach_set(name, np.ascontiguousarray(values.ravel(), dtype=POLYGON_DTYPES[name]))
+    elif domain == 'MESH_EDGE':
+        mesh.edges.foreach_set(name, np.ascontiguousarray(values.ravel(), dtype=EDGE_DTYPES[name]))
+    elif domain == 'UV':
+        layer = mesh.uv_layers.get(name) or mesh.uv_layers.new(name=name)
+        layer.data.foreach_set('uv', np.ascontiguousarray(values, dtype=np.float32).ravel())
+    else:
+        attribute = mesh.attributes.get(name) or mesh.attributes.new(name, data_type, domain)
+        prop, width, dtype = ATTRIBUTE_VALUES[data_type]
+        attribute.data.foreach_set(prop, np.ascontiguousarray(values, dtype=dtype).ravel())
+
+
+def edge_source_index(edges, source_edges, vert_index):
+    # Source edge of every edge, through the source vertex of its ends, -1 for
+    # edges that have no counterpart.
+    if not len(source_edges):
+        return np.full(len(edges), -1)
+    stride = np.int64(max(int(source_edges.max()), int(vert_index.max(initial=0))) + 1)
+    source_keys = np.sort(source_edges, axis=1).astype(np.int64)
+    source_keys = source_keys[:, 0] * stride + source_keys[:, 1]
+    ends = np.sort(vert_index[edges], axis=1).astype(np.int64)
+    keys = ends[:, 0] * stride + ends[:, 1]
+    order = np.argsort(source_keys)
+    position = np.minimum(np.searchsorted(source_keys[order], keys), len(order) - 1)
+    return np.where(source_keys[order][position] == keys, order[position], -1)
+
+
+def read_face_sets(mesh):
+    attributes = getattr(mesh, 'attributes', None)
+    if attributes is None:
+        return None
+    attribute = attributes.get('.sculpt_face_set') or attributes.get('sculpt_face_set')
+    if attribute is None or attribute.domain != 'FACE':
+        return None
+    values = np.empty(len(attribute.data), dtype=np.int32)
+    attribute.data.foreach_get('value', values)
+    return values
+
+
+def face_average(values, loop_start, loop_total, loop_verts):
+    if len(loop_start) == 0:
+        return np.zeros(0, dtype=values.dtype)
+    return np.add.reduceat(values[loop_verts], loop_start) / loop_total
+
+
+def weights_to_vertex_group(vertex_group, weights, levels=256):
+    # vertex_group.add takes a single weight per call, so write one call per
+    # quantized weight level instead of one per vertex. Vertices that round to
+    # zero are left out of the group.
+    quantized = np.rint(np.clip(weights, 0, 1) * (levels - 1)).astype(np.int32)
+    indices = np.flatnonzero(quantized)
+    if len(indices) == 0:
+        return vertex_group
+
+    quantized = quantized[indices]
+    order = np.argsort(quantized, kind='stable')
+    indices = indices[order]
+    values, starts = np.unique(quantized[order], return_index=True)
+    for value, group in zip(values.tolist(), np.split(indices, starts[1:])):
+        vertex_group.add(group.tolist(), value / (levels - 1), 'REPLACE')
+    return vertex_group
+
+
+def vertex_group_weights(ob):
+    # Dense (vertex count, group count) weights. Deform weights have no
+    # foreach access, so this is a loop over the vertices.
+    vertices = ob.data.vertices
+    weights = np.zeros((len(vertices), len(ob.vertex_groups)), dtype=np.float32)
+    if len(ob.vertex_groups):
+        counts = np.fromiter((len(v.groups) for v in vertices), dtype=np.int64, count=len(vertices))
+        pairs = np.array([(g.group, g.weight) for v in vertices for g in v.groups], dtype=np.float64).reshape(-1, 2)
+        weights[np.repeat(np.arange(len(vertices)), counts), pairs[:, 0].astype(np.int64)] = pairs[:, 1]
+    return weights
+
+
+def write_vertex_groups(ob, names, weights, point_index):
+    # Weights from vertex_group_weights onto the object's new mesh, vertices
+    # with a negative index stay out of every group.
+    if not len(names):
+        return
+    weights = weights[np.maximum(point_index, 0)]
+    weights[point_index < 0] = 0
+    for i, name in enumerate(names):
+        group = ob.vertex_groups.get(name) or ob.vertex_groups.new(name=name)
+        weights_to_vertex_group(group, weights[:, i])
+
+
+def read_shape_keys(mesh):
+    # Shape keys as plain data, so they outlive the mesh they were read from.
+    if mesh.shape_keys is None:
+        return []
+    keys = []
+    for block in mesh.shape_keys.key_blocks:
+        co = np.empty(len(block.data) * 3, dtype=np.float32)
+        block.data.foreach_get('co', co)
+        keys.append({'name': block.name, 'co': co.reshape(-1, 3), 'relative_key': block.relative_key.name,
+                     'slider_min': block.slider_min, 'slider_max': block.slider_max, 'value': block.value,
+                     'vertex_group': block.vertex_group, 'interpolation': block.interpolation,
+                     'mute': block.mute})
+    return keys
+
+
+def write_shape_keys(ob, keys, point_index):
+    # Adds read_shape_keys to the object's new mesh as offsets from its own
+    # coordinates, so vertices that moved keep each key's displacement.
+    # Vertices with a negative index don't move with any key.
+    if not keys:
+        return
+    co = read_coords(ob.data)
+    basis = keys[0]['co']
+    source = np.maximum(point_index, 0)
+    missing = point_index < 0
+    blocks = {}
+    for key in keys:
+        offset = key['co'][source] - basis[source]
+        offset[missing] = 0
+        block = ob.shape_key_add(name=key['name'], from_mix=False)
+        block.data.foreach_set('co', (co + offset).astype(np.float32).ravel())
+        for prop in ('slider_min', 'slider_max', 'value', 'vertex_group', 'interpolation', 'mute'):
+            setattr(block, prop, key[prop])
+        blocks[key['name']] = block
+    for key in keys:
+        blocks[key['name']].relative_key = blocks.get(key['relative_key'], blocks[keys[0]['name']])
+
+
+def mask_fingerprint(mask, co):
+    crc = zlib.crc32(np.ascontiguousarray(mask).view(np.uint8))
+    crc = zlib.crc32(np.ascontiguousarray(co).view(np.uint8), crc)
+    return f'{len(mask)}:{crc:08x}'
+
+
+def geometry_fingerprint(co, polygon_count):
+    return f'{len(co)}:{polygon_count}:{zlib.crc32(np.ascontiguousarray(co).view(np.uint8)):08x}'
+
+
+def topology_fingerprint(edges, vert_count):
+    return f'{vert_count}:{len(edges)}:{zlib.crc32(np.ascontiguousarray(edges).view(np.uint8)):08x}'
+
+
+def compute_mask_statistics(mask, co):
+    # Weighted towards the mask border (f * (1 - f)) so the centroid and radius
+    # frame the masked region rather than its fully masked core.
+    weights = np.maximum(0, mask * (1 - mask)).astype(np.float64) + 0.001 * mask
+    total = weights.sum()
+    stats = {'weight': float(total),
+             'centroid': (0.0, 0.0, 0.0),
+             'radius': 0.0,
+             'bounds_min': (0.0, 0.0, 0.0),
+             'bounds_max': (0.0, 0.0, 0.0)}
+    if total <= 0:
+        return stats
+
+    centroid = weights @ co / total
+    masked = co[mask > 0]
+    stats['centroid'] = tuple(centroid.tolist())
+    stats['radius'] = float(weights @ np.linalg.norm(co - centroid, axis=1) / total)
+    stats['bounds_min'] = tuple(masked.min(axis=0).tolist())
+    stats['bounds_max'] = tuple(masked.max(axis=0).tolist())
+    return stats
+
+
+def mask_statistics(ob, arrays=None):
+    # Weighted centroid, mean radius and bounds of the mask in object space.
+    # Cached on the object and keyed by a fingerprint of mask and coordinates,
+    # so asking again on an unchanged mesh skips the computation.
+    if arrays is None:
+        arrays = MeshArrays(ob.data)
+    fingerprint = mask_fingerprint(arrays.mask, arrays.co)
+    cached = ob.get('MASK_STATS')
+    if cached and cached.get('fingerprint') == fingerprint:
+        return cached.to_dict()
+
+    stats = compute_mask_statistics(arrays.mask, arrays.co)
+    ob['MASK_STATS'] = dict(stats, fingerprint=fingerprint)
+    return stats
+
+
+class Submesh:
+    """Faces picked out of a mesh, with vertex indices compacted to the ones those faces use."""
+
+    def __init__(self, loop_start, loop_total, loop_verts, faces, vert_count):
+        if faces.dtype == bool:
+            faces = np.flatnonzero(faces)
+        self.face_index = faces
+        self.vert_count = vert_count
+
+        totals = loop_total[faces]
+        self.set_loop_totals(totals)
+        self.loop_index = np.repeat(loop_start[faces] - self.loop_start, totals) + np.arange(totals.sum())
+        self.compact(loop_verts[self.loop_index])
+
+    def set_loop_totals(self, totals):
+        self.loop_total = totals
+        self.loop_start = np.zeros(len(totals), dtype=np.int32)
+        np.cumsum(totals[:-1], out=self.loop_start[1:])
+
+    def compact(self, verts):
+        used = np.zeros(self.vert_count, dtype=bool)
+        used[verts] = True
+        self.vert_index = np.flatnonzero(used)
+        remap = np.full(self.vert_count, -1, dtype=np.int32)
+        remap[self.vert_index] = np.arange(len(self.vert_index), dtype=np.int32)
+        self.loop_verts = remap[verts]
+
+    @property
+    def loop_face(self):
+        return np.repeat(np.arange(len(self.loop_total)), self.loop_total)
+
+    def vert_face_count(self):
+        return np.bincount(self.loop_verts, minlength=len(self.vert_index))
+
+    def remove_loops(self, remove):
+        # Drops corners from their faces, faces that would end up with less
+        # than three corners are left untouched.
+        loop_face = self.loop_face
+        face_count = len(self.loop_total)
+        remaining = self.loop_total - np.bincount(loop_face, weights=remove, minlength=face_count)
+        remove = remove & (remaining >= 3)[loop_face]
+        keep = ~remove
+
+        self.set_loop_totals((self.loop_total - np.bincount(loop_face[remove], minlength=face_count)).astype(np.int32))
+        self.loop_index = self.loop_index[keep]
+        self.compact(self.vert_index[self.loop_verts[keep]])
+
+    def islands(self, loop_edges):
+        # Splits the faces into edge connected islands, returns their original face indices.
+        edges = loop_edges[self.loop_index]
+        order = np.argsort(edges, kind='stable')
+        edges = edges[order]
+        faces = self.loop_face[order]
+        shared = edges[1:] == edges[:-1]
+        pairs = np.column_stack((faces[:-1][shared], faces[1:][shared]))
+        labels = connected_components(pairs, len(self.face_index))
+        order = np.argsort(labels, kind='stable')
+        return np.split(self.face_index[order], np.cumsum(np.bincount(labels))[:-1])
+
+    @classmethod
+    def from_arrays(cls, arrays, faces):
+        return cls(*arrays.polygons, faces, len(arrays.mesh.vertices))
+
+    def to_mesh(self, arrays, name, co=None, attributes=None):
+        # Copies every attribute of the source mesh onto its part unless a
+        # read_attributes snapshot (which should include edges) is given.
+        source = arrays.mesh
+        if co is None:
+            co = arrays.co[self.vert_index]
+        mesh = mesh_from_arrays(name, co, self.loop_start, self.loop_total, self.loop_verts)
+
+        if attributes is None:
+            attributes = read_attributes(source, edges=True)
+        if attributes:
+            edge_index = edge_source_index(read_edges(mesh), arrays.edges, self.vert_index)
+            write_attributes(mesh, attributes, self.vert_index, self.loop_index, self.face_index, edge_index)
+        for material in source.materials:
+            mesh.materials.append(material)
+
+        if mask_layer_get(source) is not None:
+            write_mask(mesh, arrays.mask[self.vert_index])
+        return mesh
+
+
+class MeshArrays:
+    """Lazily read NumPy views of a mesh, kept around so later reads reuse the same buffers."""
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self._mask = None
+        self._co = None
+        self._normals = None
+        self._edges = None
+        self._loop_edges = None
+        self._polygons = (None, None, None)
+        self._face_mask = None
+        self._valid = set()
+
+    def invalidate(self):
+        self._valid.clear()
+
+    def _read(self, name, reader):
+        if name not in self._valid:
+            setattr(self, '_' + name, reader())
+            self._valid.add(name)
+        return getattr(self, '_' + name)
+
+    @property
+    def mask(self):
+        return self._read('mask', lambda: read_mask(self.mesh, self._mask))
+
+    @property
+    def co(self):
+        return self._read('co', lambda: read_coords(self.mesh, self._co))
+
+    @property
+    def normals(self):
+        return self._read('normals', lambda: read_normals(self.mesh, self._normals))
+
+    @property
+    def edges(self):
+        return self._read('edges', lambda: read_edges(self.mesh, self._edges))
+
+    @property
+    def loop_edges(self):
+        return self._read('loop_edges', lambda: read_loop_edges(self.mesh, self._loop_edges))
+
+    @property
+    def boundary_edges(self):
+        return self.edges[edge_face_count(self.loop_edges, len(self.edges)) == 1]
+
+    @property
+    def polygons(self):
+        return self._read('polygons', lambda: read_polygons(self.mesh, *self._polygons))
+
+    @property
+    def face_mask(self):
+        return self._read('face_mask', lambda: face_average(self.mask, *self.polygons))
+
+    def write_mask(self, mask):
+        write_mask(self.mesh, mask)
+        self._valid.discard('mask')
+        self._valid.discard('face_mask')
+
+    def write_coords(self, co):
+        write_coords(self.mesh, co)
+        self._valid.discard('co')
+        self._valid.discard('normals')
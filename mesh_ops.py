@@ -1,4 +1,6 @@
 from .multifile import register_class
+from .mesh_arrays import read_coords, write_coords
+from .reprojection import SurfaceProjector
 import bpy
 
 
@@ -21,26 +23,21 @@ class SSmooth(bpy.types.Operator):
         ob = context.active_object
         last_mode = ob.mode
         bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.ops.object.duplicate()
-        nob = context.active_object
-        context.view_layer.objects.active = ob
+        projector = SurfaceProjector.from_mesh(ob.data)
         smooth = ob.modifiers.new(type='SMOOTH', name='Smooth')
         smooth.factor = self.factor
         smooth.iterations = self.repeat
         bpy.ops.object.modifier_apply(modifier=smooth.name)
-        swrink = ob.modifiers.new(type='SHRINKWRAP', name='Snap')
-        swrink.target = nob
-        swrink.wrap_method='PROJECT'
-        swrink.use_negative_direction = True
-        swrink.use_positive_direction = True
+
+        # Bind the recovery to the smoothed shape, then snap it back to the
+        # original surface so the corrective smooth restores the smoothed detail.
         recover = ob.modifiers.new(type='CORRECTIVE_SMOOTH', name='recover')
         recover.iterations=self.recovery_repeat
         recover.smooth_type='LENGTH_WEIGHTED'
         recover.factor=1
-        for sob in context.view_layer.objects.selected:
-            sob.select_set(False)
-        ob.select_set(True)
-        bpy.ops.object.convert()
-        bpy.data.meshes.remove(nob.data)
+        recover.rest_source = 'BIND'
+        bpy.ops.object.correctivesmooth_bind(modifier=recover.name)
+        write_coords(ob.data, projector.snap(read_coords(ob.data)))
+        bpy.ops.object.modifier_apply(modifier=recover.name)
         bpy.ops.object.mode_set(mode=last_mode)
         return {'FINISHED'}
@@ -1,8 +1,10 @@
 import bpy
 from . interactive import InteractiveOperator, screen_space_to_3d
 from . multifile import register_class, topbar_mt_app_system_add
-from math import sin, cos, pi
+from . reprojection import SpatialCache
+from math import pi
 from mathutils import Vector
+import numpy as np
 
 
 @topbar_mt_app_system_add
@@ -49,6 +51,7 @@ class ObjectBrush(InteractiveOperator):
             self.draw_3d.depth_test = False
 
             normal_avg = normal.copy()
+            projector = SpatialCache.projector(object)
 
             for h in range(5):
                 u = normal.orthogonal().normalized()
@@ -56,17 +59,10 @@ class ObjectBrush(InteractiveOperator):
 
                 n = 20
 
-                hit_points = []
-                for i in range(n):
-                    t = 2 * pi * (i / n) + ((h + 1) / 2.5 * (pi / n))
-                    point = (sin(t) * u + cos(t) * v) * ((h + 1) / 5) + location
-
-                    result, location1, normal, index = object.closest_point_on_mesh(point)
-                    if result:
-                        hit_points.append(location1)
-
-                        for vindex in object.data.polygons[index].vertices:
-                            normal_avg += object.data.vertices[vindex].normal
+                t = 2 * pi * (np.arange(n) / n) + ((h + 1) / 2.5 * (pi / n))
+                points = (np.sin(t)[:, None] * np.array(u) + np.cos(t)[:, None] * np.array(v)) * ((h + 1) / 5) + np.array(location)
+                hit_points, hit_normals, index = projector.nearest(points)
+                normal_avg += Vector(hit_normals[index >= 0].sum(axis=0))
 
                 normal = normal_avg.normalized()
 
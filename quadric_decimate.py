@@ -0,0 +1,471 @@
+import bpy
+import bmesh
+import numpy as np
+from .mesh_arrays import (MeshArrays, edge_face_count, loop_next, read_face_sets, read_attributes,
+                          write_attributes, mesh_write_arrays, mask_layer_get, read_mask, write_mask, read_edges,
+                          vertex_group_weights, write_vertex_groups, weights_to_vertex_group)
+from .sparse_matrix import independent_edges
+
+# Constraint planes along feature edges, relative to an average sized triangle.
+FEATURE_WEIGHT = 100.0
+# Small length term so flat regions still collapse their shortest edges first.
+LENGTH_WEIGHT = 1e-3
+# Same meaning as the vertex group factor of the decimate operator.
+MASK_FACTOR = 10.0
+# Relative noise on the collapse costs when ordering them.
+JITTER = 0.1
+# Edges per batch when updating collapse costs.
+CHUNK_SIZE = 4096
+
+
+def triangulate_loops(loop_start, loop_total):
+    # Fan triangulation, returns the loop of every triangle corner and the polygon of every triangle.
+    tri_count = np.maximum(loop_total - 2, 0)
+    tri_face = np.repeat(np.arange(len(loop_start)), tri_count)
+    offset = np.arange(tri_count.sum()) - np.repeat(np.cumsum(tri_count) - tri_count, tri_count)
+    first = loop_start[tri_face]
+    return np.column_stack((first, first + offset + 1, first + offset + 2)), tri_face
+
+
+def edge_keys(a, b, stride):
+    return np.minimum(a, b).astype(np.int64) * stride + np.maximum(a, b)
+
+
+def plane_quadrics(normals, offsets, weights):
+    # The 10 distinct coefficients of w * p p^T for the planes p = (n, d),
+    # one row per coefficient.
+    a, b, c = normals
+    d = offsets
+    return np.stack((a * a, a * b, a * c, a * d, b * b, b * c, b * d, c * c, c * d, d * d)) * weights
+
+
+def quadric_error(q, x, y, z):
+    return (x * (q[0] * x + 2 * (q[1] * y + q[2] * z + q[3])) + y * (q[4] * y + 2 * (q[5] * z + q[6])) +
+            z * (q[7] * z + 2 * q[8]) + q[9])
+
+
+def quadric_minimum(q, fx, fy, fz):
+    # Points minimizing every quadric through the adjugate of the symmetric
+    # 3x3 part, the fallback point where the system is close to singular.
+    a, b, c, d, e, f = q[0], q[1], q[2], q[4], q[5], q[7]
+    c00 = d * f - e * e
+    c01 = c * e - b * f
+    c02 = b * e - c * d
+    c11 = a * f - c * c
+    c12 = b * c - a * e
+    c22 = a * d - b * b
+    det = a * c00 + b * c01 + c * c02
+    trace = a + d + f
+    solvable = np.abs(det) > 1e-6 * trace * trace * trace
+    inv = -1 / np.where(solvable, det, 1)
+    x, y, z = q[3], q[6], q[8]
+    return (np.where(solvable, (c00 * x + c01 * y + c02 * z) * inv, fx),
+            np.where(solvable, (c01 * x + c11 * y + c12 * z) * inv, fy),
+            np.where(solvable, (c02 * x + c12 * y + c22 * z) * inv, fz))
+
+
+def triangle_normals(p0, p1, p2):
+    # Unnormalized normals of triangles given as rows of corner coordinates.
+    ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+    vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+    return uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+
+
+def vertex_sums(verts, values, count):
+    return np.stack([np.bincount(verts, weights=row, minlength=count) for row in values])
+
+
+def corner_seam_edges(values, loop_start, loop_total, loop_verts, loop_edges, edges):
+    # Edges where a corner attribute (UVs) differs between the faces on either
+    # side, at either end of the edge.
+    nxt = loop_next(loop_start, loop_total)
+    edge = np.concatenate((loop_edges, loop_edges)).astype(np.int64)
+    verts = np.concatenate((loop_verts, loop_verts[nxt]))
+    slots = edge * 2 + (verts != edges[edge, 0])
+    values = np.concatenate((values, values[nxt]))
+    order = np.argsort(slots, kind='stable')
+    slots = slots[order]
+    values = values[order]
+    starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+    spread = (np.maximum.reduceat(values, starts) - np.minimum.reduceat(values, starts)).max(axis=1)
+    seams = np.zeros(len(edges), dtype=bool)
+    seams[slots[starts[spread > 1e-5]] // 2] = True
+    return seams
+
+
+def feature_edges(mesh, arrays, attributes):
+    # Returns the edges the decimation keeps in place (open boundaries and
+    # face set borders, which may still be simplified along their length),
+    # the vertices that must not move at all (non manifold edges, marked
+    # seams and UV discontinuities) and the marked seams themselves.
+    edges = arrays.edges
+    loop_edges = arrays.loop_edges
+    loop_start, loop_total, loop_verts = arrays.polygons
+    count = edge_face_count(loop_edges, len(edges))
+    features = count != 2
+
+    face_sets = read_face_sets(mesh)
+    if face_sets is not None:
+        face_sets = face_sets[np.repeat(np.arange(len(loop_start)), loop_total)]
+        low = np.full(len(edges), np.iinfo(np.int32).max)
+        high = np.full(len(edges), np.iinfo(np.int32).min)
+        np.minimum.at(low, loop_edges, face_sets)
+        np.maximum.at(high, loop_edges, face_sets)
+        features |= (low != high) & (count > 0)
+
+    marked = np.zeros(len(edges), dtype=bool)
+    mesh.edges.foreach_get('use_seam', marked)
+    seams = marked.copy()
+    for name, domain, data_type, values in attributes:
+        if domain in ('CORNER', 'UV') and data_type == 'FLOAT2':
+            seams |= corner_seam_edges(values, loop_start, loop_total, loop_verts, loop_edges, edges)
+
+    fixed = np.zeros(len(arrays.co), dtype=bool)
+    fixed[edges[(count > 2) | seams].ravel()] = True
+    return features, fixed, marked
+
+
+class QuadricDecimator:
+    # Garland-Heckbert edge collapse on triangle arrays. A sequential heap
+    # would pop one edge at a time in Python, so instead every round sorts the
+    # cheapest part of the collapse costs and takes the edges whose ends are
+    # more than one edge apart, which keeps each batch as valid as a one by
+    # one collapse. The edge list is kept between rounds, collapses rename
+    # and merge its rows instead of it being rebuilt from the triangles, and
+    # collapse positions and costs are only recomputed around the vertices
+    # that changed. Coordinates and quadrics are stored one row per component.
+    def __init__(self, co, tris, corners, features, fixed, mask=None, mask_factor=0):
+        self.co = np.ascontiguousarray(co.T, dtype=np.float64)
+        self.tris = tris
+        self.corners = corners
+        self.tri_index = np.arange(len(tris))
+        self.fixed = fixed
+        self.mask = None if mask is None else mask.astype(np.float64)
+        self.mask_factor = mask_factor
+        self.stride = len(co)
+        self.rng = np.random.RandomState(0)
+
+        a = tris.ravel()
+        b = tris[:, [1, 2, 0]].ravel()
+        keys, tri_edge = np.unique(edge_keys(a, b, self.stride), return_inverse=True)
+        self.edges = np.stack((keys // self.stride, keys % self.stride)).astype(tris.dtype)
+        self.tri_edge = tri_edge.reshape(-1, 3).astype(tris.dtype)
+        self.edge_faces = np.bincount(tri_edge.ravel(), minlength=len(keys))
+        # Feature edges that aren't on any triangle (loose edges) are skipped.
+        feature_keys = edge_keys(features[:, 0], features[:, 1], self.stride)
+        found = np.minimum(np.searchsorted(keys, feature_keys), len(keys) - 1)
+        self.edge_feature = np.zeros(len(keys), dtype=bool)
+        self.edge_feature[found[keys[found] == feature_keys]] = True
+        self.edge_position = np.zeros((3, len(keys)))
+        self.edge_cost = np.zeros(len(keys))
+        self.dirty = np.ones(self.stride, dtype=bool)
+        self.status = np.zeros(self.stride, dtype=np.int8)
+
+        p0, p1, p2 = (np.take(self.co, tris[:, i], axis=1) for i in range(3))
+        normals = np.stack(triangle_normals(p0, p1, p2))
+        area = np.sqrt((normals * normals).sum(axis=0))
+        normals /= np.maximum(area, 1e-30)
+        weights = area / max(area.mean(), 1e-30)
+        q = plane_quadrics(normals, -(normals * p0).sum(axis=0), weights)
+        self.quadrics = sum(vertex_sums(tris[:, i], q, self.stride) for i in range(3)).T.copy()
+
+        # Planes through every feature edge, perpendicular to its faces, hold
+        # boundaries and face set borders in place.
+        on_feature = self.edge_feature[self.tri_edge.ravel()]
+        if on_feature.any():
+            a = a[on_feature]
+            b = b[on_feature]
+            d = self.co[:, b] - self.co[:, a]
+            n = np.repeat(normals, 3, axis=1)[:, on_feature]
+            side = np.stack((d[1] * n[2] - d[2] * n[1], d[2] * n[0] - d[0] * n[2], d[0] * n[1] - d[1] * n[0]))
+            side /= np.maximum(np.sqrt((side * side).sum(axis=0)), 1e-30)
+            q = plane_quadrics(side, -(side * self.co[:, a]).sum(axis=0), np.full(len(a), FEATURE_WEIGHT))
+            self.quadrics += vertex_sums(np.concatenate((a, b)), np.concatenate((q, q), axis=1), self.stride).T
+
+    def collapse_candidates(self):
+        ea, eb = self.edges
+        feature = self.edge_feature
+        valence = np.bincount(self.edges[:, feature].ravel(), minlength=self.stride)
+        free = (valence == 0) & ~self.fixed
+        line = (valence == 2) & ~self.fixed
+        status = free * 2 + line
+        self.dirty |= status != self.status
+        self.status = status
+
+        # Free vertices collapse to the quadric optimum, onto a constrained
+        # neighbor, or along a feature line when they sit in the middle of one.
+        fa = free[ea]
+        fb = free[eb]
+        along = feature & ~fa & ~fb
+        valid = (fa | fb | (along & (line[ea] | line[eb]))) & (self.edge_faces <= 2)
+        swap = (fa & ~fb) | (along & line[ea] & ~line[eb])
+        keep = np.where(swap, eb, ea)
+        remove = np.where(swap, ea, eb)
+        moving = fa & fb
+
+        stale = np.flatnonzero(self.dirty[ea] | self.dirty[eb])
+        self.dirty[:] = False
+        # Chunked, so the temporaries stay small enough to be reused.
+        for start in range(0, len(stale), CHUNK_SIZE):
+            self.update_costs(stale[start:start + CHUNK_SIZE], swap, moving)
+        return keep, remove, moving, valid
+
+    def update_costs(self, stale, swap, moving):
+        a = self.edges[0, stale]
+        b = self.edges[1, stale]
+        ax, ay, az = np.take(self.co, a, axis=1)
+        bx, by, bz = np.take(self.co, b, axis=1)
+        length2 = (bx - ax) ** 2 + (by - ay) ** 2 + (bz - az) ** 2
+        mx, my, mz = (ax + bx) * 0.5, (ay + by) * 0.5, (az + bz) * 0.5
+        q = (np.take(self.quadrics, a, axis=0) + np.take(self.quadrics, b, axis=0)).T
+        ox, oy, oz = quadric_minimum(q, mx, my, mz)
+        optimum = moving[stale] & ((ox - mx) ** 2 + (oy - my) ** 2 + (oz - mz) ** 2 <= length2)
+        middle = moving[stale] & ~optimum
+        to_b = swap[stale]
+        x = np.where(optimum, ox, np.where(middle, mx, np.where(to_b, bx, ax)))
+        y = np.where(optimum, oy, np.where(middle, my, np.where(to_b, by, ay)))
+        z = np.where(optimum, oz, np.where(middle, mz, np.where(to_b, bz, az)))
+
+        cost = quadric_error(q, x, y, z) + LENGTH_WEIGHT * length2
+        if self.mask is not None and self.mask_factor:
+            cost *= 1 + (2 - self.mask[a] - self.mask[b]) * self.mask_factor
+        self.edge_position[0, stale] = x
+        self.edge_position[1, stale] = y
+        self.edge_position[2, stale] = z
+        self.edge_cost[stale] = cost
+
+    def step(self, collapses):
+        co = self.co
+        tris = self.tris
+        edges = self.edges
+        stride = self.stride
+        keep, remove, moving, valid = self.collapse_candidates()
+
+        # Only the cheapest part of the queue is ordered, with noise so equal
+        # costs on regular grids don't line up into long priority chains.
+        # Edges that failed the checks below are left out until one of their
+        # ends changes.
+        candidates = np.flatnonzero(valid & (self.edge_cost < np.inf))
+        if len(candidates) == 0:
+            return None
+        priority = self.edge_cost[candidates] * (1 + JITTER * self.rng.random_sample(len(candidates)))
+        size = max(min(len(candidates) // 4, 2 * collapses), min(len(candidates), 256))
+        if size < len(candidates):
+            part = np.argpartition(priority, size - 1)[:size]
+        else:
+            part = np.arange(len(candidates))
+        window = candidates[part[np.argsort(priority[part])]]
+
+        # Collapses more than one edge apart never share a triangle or change
+        # each other's one rings, so every check below holds for the batch.
+        chosen = window[independent_edges(edges[:, window].T, edges.T, stride)[:collapses]]
+        index = np.arange(len(chosen))
+        k = keep[chosen]
+        r = remove[chosen]
+        tag = np.full(stride, -1, dtype=np.int32)
+        tag[k] = index
+        tag[r] = index
+
+        # Link condition: the endpoints may only share the neighbors opposite the edge.
+        is_kept = np.zeros(stride, dtype=bool)
+        is_kept[k] = True
+        near = np.compress((tag[edges[0]] >= 0) | (tag[edges[1]] >= 0), edges, axis=1)
+        sides = ([], [])
+        for u, v in (near, near[::-1]):
+            at = tag[u] >= 0
+            kept = is_kept[u]
+            codes = tag[u].astype(np.int64) * stride + v
+            sides[0].append(codes[at & kept])
+            sides[1].append(codes[at & ~kept])
+        common = np.intersect1d(np.concatenate(sides[0]), np.concatenate(sides[1]), assume_unique=True)
+        good = np.bincount(common // stride, minlength=len(chosen)) == self.edge_faces[chosen]
+
+        # Drop collapses that would flip or flatten one of their surviving triangles.
+        tri_tag = tag[tris]
+        tri_owner = np.maximum(np.maximum(tri_tag[:, 0], tri_tag[:, 1]), tri_tag[:, 2])
+        touched = np.flatnonzero(tri_owner >= 0)
+        owner = tri_owner[touched]
+        verts = tris[touched]
+        moved = tri_tag[touched] >= 0
+        vanish = moved.sum(axis=1) == 2
+        position = np.take(self.edge_position, chosen[owner], axis=1)
+        old = [np.take(co, verts[:, i], axis=1) for i in range(3)]
+        new = [np.where(moved[:, i], position, old[i]) for i in range(3)]
+        n_old = triangle_normals(*old)
+        n_new = triangle_normals(*new)
+        flips = n_old[0] * n_new[0] + n_old[1] * n_new[1] + n_old[2] * n_new[2] <= 0
+        good[owner[~vanish & flips]] = False
+        self.edge_cost[chosen[~good]] = np.inf
+        if not good.any():
+            return 0
+
+        chosen = chosen[good]
+        k = k[good]
+        r = r[good]
+        co[:, k] = self.edge_position[:, chosen]
+        self.quadrics[k] += self.quadrics[r]
+        self.dirty[k] = True
+        if self.mask is not None:
+            average = moving[chosen]
+            self.mask[k[average]] = (self.mask[k[average]] + self.mask[r[average]]) * 0.5
+
+        # Every triangle on a collapsed edge takes its other two edges along:
+        # the one at the removed vertex merges into the one at the kept vertex.
+        gone = vanish & good[owner]
+        owner = np.cumsum(good)[owner[gone]] - 1
+        gone = touched[gone]
+        slots = self.tri_edge[gone]
+        others = slots[slots != chosen[owner][:, None]].reshape(-1, 2)
+        at_removed = (edges[0, others[:, 0]] == r[owner]) | (edges[1, others[:, 0]] == r[owner])
+        merged = np.where(at_removed, others[:, 0], others[:, 1])
+        target = np.where(at_removed, others[:, 1], others[:, 0])
+        self.edge_faces[target] += self.edge_faces[merged] - 2
+        self.edge_feature[target] |= self.edge_feature[merged]
+        edge_map = np.arange(edges.shape[1])
+        edge_map[merged] = target
+        live = np.ones(edges.shape[1], dtype=bool)
+        live[merged] = False
+        live[chosen] = False
+
+        # Corners of the removed vertex take the attributes of the kept one as
+        # seen from a triangle on the collapsed edge.
+        replacement = np.full(stride, -1, dtype=self.corners.dtype)
+        replacement[r[owner]] = self.corners[gone][tris[gone] == k[owner][:, None]]
+        remap = np.arange(stride, dtype=tris.dtype)
+        remap[r] = k
+
+        alive = np.ones(len(tris), dtype=bool)
+        alive[gone] = False
+        # np.compress, boolean indexing is several times slower on masks this irregular.
+        tris = np.compress(alive, tris, axis=0)
+        corners = np.compress(alive, self.corners, axis=0)
+        replaced = replacement[tris]
+        self.corners = np.where(replaced >= 0, replaced, corners)
+        self.tris = remap[tris]
+        self.tri_index = np.compress(alive, self.tri_index)
+        renumber = np.cumsum(live, dtype=tris.dtype) - 1
+        self.tri_edge = renumber[edge_map][np.compress(alive, self.tri_edge, axis=0)]
+        self.edges = remap[np.compress(live, edges, axis=1)]
+        self.edge_faces = np.compress(live, self.edge_faces)
+        self.edge_feature = np.compress(live, self.edge_feature)
+        self.edge_position = np.compress(live, self.edge_position, axis=1)
+        self.edge_cost = np.compress(live, self.edge_cost)
+        return len(chosen)
+
+    def decimate(self, target):
+        steps = 0
+        while len(self.tris) > target:
+            if self.step(max(1, (len(self.tris) - target) // 2)) is None:
+                break
+            steps += 1
+        return steps
+
+    def result(self):
+        used = np.unique(self.tris)
+        remap = np.full(self.stride, -1, dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        return self.co[:, used].T, remap[self.tris], used
+
+
+def decimate_mesh(mesh, ratio, mask_factor=0):
+    # Decimates a mesh in place to ratio of its triangle count, weighted
+    # towards the masked area when mask_factor is set. Point, corner and face
+    # attributes follow the vertices, corners and faces that survive. Returns
+    # the triangle count and the source vertex of every remaining vertex.
+    arrays = MeshArrays(mesh)
+    loop_start, loop_total, loop_verts = arrays.polygons
+    attributes = read_attributes(mesh)
+    features, fixed, seams = feature_edges(mesh, arrays, attributes)
+    tri_loops, tri_face = triangulate_loops(loop_start, loop_total)
+    has_mask = mask_layer_get(mesh) is not None
+
+    decimator = QuadricDecimator(arrays.co, loop_verts[tri_loops], tri_loops, arrays.edges[features], fixed,
+                                 arrays.mask if has_mask else None, mask_factor)
+    decimator.decimate(int(len(tri_loops) * ratio))
+    co, tris, vert_index = decimator.result()
+    seam_edges = arrays.edges[seams]
+
+    mesh.clear_geometry()
+    mesh_write_arrays(mesh, co, np.arange(0, tris.size, 3), np.full(len(tris), 3), tris.ravel())
+    write_attributes(mesh, attributes, vert_index, decimator.corners.ravel(), tri_face[decimator.tri_index])
+    if has_mask:
+        write_mask(mesh, decimator.mask[vert_index])
+
+    if len(seam_edges):
+        remap = np.full(decimator.stride, -1, dtype=np.int64)
+        remap[vert_index] = np.arange(len(vert_index))
+        seam_edges = remap[seam_edges]
+        seam_edges = seam_edges[(seam_edges >= 0).all(axis=1)]
+        edges = read_edges(mesh)
+        marked = np.isin(edge_keys(edges[:, 0], edges[:, 1], len(co)),
+                         edge_keys(seam_edges[:, 0], seam_edges[:, 1], len(co)))
+        mesh.edges.foreach_set('use_seam', marked)
+    mesh.update()
+    return len(tris), vert_index
+
+
+def bmesh_write_weights(bm, weights):
+    # Dense weights into the deform layer of an edit BMesh, VertexGroup.add
+    # doesn't work in Edit mode.
+    deform = bm.verts.layers.deform.verify()
+    bm.verts.ensure_lookup_table()
+    verts, groups = np.nonzero(weights)
+    for vert, group, weight in zip(verts.tolist(), groups.tolist(), weights[verts, groups].tolist()):
+        bm.verts[vert][deform][group] = weight
+
+
+def native_decimate(ob, ratio, mask_factor=0):
+    # The Edit mode decimate operator, the mask weights it through a
+    # temporary vertex group.
+    last_mode = ob.mode
+    bpy.ops.object.mode_set(mode='OBJECT')
+    vg = None
+    if mask_factor and mask_layer_get(ob.data) is not None:
+        vg = weights_to_vertex_group(ob.vertex_groups.new(name='DECIMATION_VG'), read_mask(ob.data))
+        ob.vertex_groups.active_index = vg.index
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_all(action='SELECT')
+    if vg is not None:
+        bpy.ops.mesh.decimate(ratio=ratio, use_vertex_group=True, vertex_group_factor=mask_factor)
+    else:
+        bpy.ops.mesh.decimate(ratio=ratio)
+    bpy.ops.object.mode_set(mode='OBJECT')
+    if vg is not None:
+        ob.vertex_groups.remove(vg)
+    bpy.ops.object.mode_set(mode=last_mode)
+    return len(ob.data.polygons)
+
+
+def decimate_object(ob, ratio, mask_factor=0):
+    # decimate_mesh in whatever mode the object is in, vertex group weights
+    # follow the surviving vertices. The edit BMesh is refilled in place
+    # instead of leaving and entering Edit mode. Sculpt mode is left and
+    # entered again so its BVH is rebuilt for the new topology, without
+    # dynamic topology that involves no BMesh conversion. Meshes with shape
+    # keys go through native_decimate, which keeps them.
+    mesh = ob.data
+    if mesh.shape_keys:
+        return native_decimate(ob, ratio, mask_factor)
+
+    groups = [group.name for group in ob.vertex_groups]
+    if ob.mode == 'EDIT':
+        ob.update_from_editmode()
+        weights = vertex_group_weights(ob)
+        faces, vert_index = decimate_mesh(mesh, ratio, mask_factor)
+        bm = bmesh.from_edit_mesh(mesh)
+        bm.clear()
+        bm.from_mesh(mesh)
+        if len(groups):
+            bmesh_write_weights(bm, weights[vert_index])
+        bmesh.update_edit_mesh(mesh)
+        return faces
+
+    last_mode = ob.mode
+    if last_mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    weights = vertex_group_weights(ob)
+    faces, vert_index = decimate_mesh(mesh, ratio, mask_factor)
+    write_vertex_groups(ob, groups, weights, vert_index)
+    if last_mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode=last_mode)
+    return faces
@@ -1,11 +1,20 @@
 import bpy
 import bmesh
+import time
+import numpy as np
 from .multifile import register_class
+from .mesh_arrays import (MeshArrays, Submesh, edge_face_count, face_average, loop_next, polygon_edges,
+                          read_attributes, write_attributes, mesh_write_arrays, mask_layer_get, write_mask,
+                          read_edges, edge_source_index, vertex_group_weights, write_vertex_groups)
+from .mesh_analysis import MeshAnalysis
+from .sparse_matrix import adjacency_matrix, mean_matrix, independent_pairs
+from .reprojection import SurfaceProjector, bvh_from_arrays
+from .cap_fill import boundary_chains, cap_chain, fill_holes
+from .quadric_decimate import decimate_object
+from .attribute_transfer import AttributeTransfer
 from mathutils import Vector
 from mathutils.bvhtree import BVHTree
-from mathutils.kdtree import KDTree
-from mathutils.geometry import barycentric_transform
-from random import shuffle, random
+from random import random
 
 
 def is_mesh_pool(context):
@@ -16,25 +25,283 @@ def random_vector():
     return Vector((random() - 0.5, random() - 0.5, random() - 0.5,))
 
 
-def surfacce_snap(vertices, tree):
-    for vert in vertices:
-        location, normal, index, dist = tree.find_nearest(vert.co)
-        if location:
-            vert.co = location
-
-
-def average_vert_curvature(vert):
-    return sum((abs(edge.other_vert(vert).normal.dot(vert.normal)) for edge in vert.link_edges)) / len(
-        vert.link_edges)
-
-
-def get_vert_curvature_vector(vert):
-    other = min(vert.link_edges, key=lambda e: e.other_vert(vert).normal.dot(vert.normal)).other_vert(vert)
-    return other.normal.cross(vert.normal)
-
-
-def edge_length_squared(edge):
-    return (edge.verts[0].co - edge.verts[1].co).length_squared
+def voxel_remesh_mesh(mesh, voxel_size, adaptivity=0.0):
+    # Voxel remesh through a Remesh modifier on a temporary object, so it
+    # works on meshes that aren't the active object.
+    ob = bpy.data.objects.new('.voxel_remesh', mesh)
+    bpy.context.scene.collection.objects.link(ob)
+    remesh = ob.modifiers.new(type='REMESH', name='Remesh')
+    remesh.mode = 'VOXEL'
+    remesh.voxel_size = voxel_size
+    remesh.adaptivity = adaptivity
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    result = bpy.data.meshes.new_from_object(ob.evaluated_get(depsgraph))
+    bpy.data.objects.remove(ob)
+    return result
+
+
+def surface_area(mesh):
+    areas = np.empty(len(mesh.polygons), dtype=np.float32)
+    mesh.polygons.foreach_get('area', areas)
+    return float(areas.sum(dtype=np.float64))
+
+
+def estimate_voxel_faces(area, voxel_size):
+    # The voxel remesher puts a quad on every voxel face the surface passes,
+    # about 1.5 per voxel_size squared of area averaged over orientations.
+    return int(1.5 * area / voxel_size ** 2)
+
+
+class ProgressiveRemeshPreview:
+    # Voxel remeshes of a snapshot of the mesh at coarser voxel sizes, shown
+    # on a wire overlay object. Only one level runs per step() so a modal
+    # operator handles events in between, and changed settings drop whatever
+    # levels were still queued for the old ones.
+    levels = (4, 2)
+
+    def __init__(self, context, ob):
+        self.source = ob.data.copy()
+        self.area = surface_area(self.source)
+        self.overlay = bpy.data.objects.new(ob.name + '_preview', bpy.data.meshes.new(ob.name + '_preview'))
+        context.collection.objects.link(self.overlay)
+        self.overlay.matrix_world = ob.matrix_world
+        self.overlay.display_type = 'WIRE'
+        self.overlay.show_in_front = True
+        self.overlay.hide_select = True
+        self.settings = None
+        self.queue = []
+        self.level = None
+        self.estimate = 0
+
+    def request(self, voxel_size, adaptivity):
+        settings = (voxel_size, adaptivity)
+        if settings != self.settings:
+            self.settings = settings
+            self.queue = list(self.levels)
+            self.estimate = estimate_voxel_faces(self.area, voxel_size)
+
+    @property
+    def done(self):
+        return not self.queue
+
+    def step(self):
+        if not self.queue:
+            return False
+
+        self.level = self.queue.pop(0)
+        voxel_size, adaptivity = self.settings
+        mesh = voxel_remesh_mesh(self.source, voxel_size * self.level, adaptivity)
+        old = self.overlay.data
+        self.overlay.data = mesh
+        bpy.data.meshes.remove(old)
+        if adaptivity == 0:
+            self.estimate = len(mesh.polygons) * self.level ** 2
+        return True
+
+    def free(self):
+        mesh = self.overlay.data
+        bpy.data.objects.remove(self.overlay)
+        bpy.data.meshes.remove(mesh)
+        bpy.data.meshes.remove(self.source)
+
+
+def curvature_sizing(analysis, edges, max_length, min_length, tolerance, mask=None, mask_factor=1.0, grading=0.5):
+    # Edge length per vertex that keeps the chord error on the most curved
+    # direction near tolerance (a chord of length L on radius r deviates by
+    # about L^2 / 8r), shortened where masked. Lengths then only grow by
+    # grading times the distance from shorter ones, so density fades out of
+    # detailed areas instead of jumping.
+    curvature = np.maximum(np.abs(analysis.max_curvature), 1e-12)
+    sizing = np.clip(np.sqrt(8 * tolerance / curvature), min_length, max_length)
+    if mask is not None:
+        sizing = np.maximum(sizing / (1 + mask * (mask_factor - 1)), min_length)
+
+    a, b = edges[:, 0], edges[:, 1]
+    step = analysis.edge_lengths * grading
+    for _ in range(32):
+        limited = sizing.copy()
+        np.minimum.at(limited, a, sizing[b] + step)
+        np.minimum.at(limited, b, sizing[a] + step)
+        if np.array_equal(limited, sizing):
+            break
+        sizing = limited
+    return sizing
+
+
+def grow_region(adjacency, co, seed, distance):
+    # Vertices within an edge path distance of the seed vertices, walking
+    # out from the frontier only so the cost follows the size of the region.
+    dist = np.full(len(co), np.inf)
+    dist[seed] = 0
+    frontier = np.flatnonzero(seed)
+    while len(frontier):
+        positions, owner = adjacency.gather(frontier)
+        source = frontier[owner]
+        target = adjacency.indices[positions]
+        reach = dist[source] + np.linalg.norm(co[target] - co[source], axis=1)
+        better = (reach <= distance) & (reach < dist[target])
+        np.minimum.at(dist, target[better], reach[better])
+        frontier = np.unique(target[better])
+    return dist <= distance
+
+
+def stitch_loops(outer, inner, co):
+    # Triangle strip closing the gap between a hole in the mesh (outer, in
+    # the winding of the faces around it) and the boundary of the patch that
+    # fills it (inner, in the patch winding). Both loops are walked by arc
+    # length from their closest pair of vertices.
+    inner = inner[::-1]
+    start = np.argmin(np.linalg.norm(co[inner] - co[outer[0]], axis=1))
+    inner = np.roll(inner, -start)
+
+    def closed(loop):
+        loop = np.append(loop, loop[0])
+        length = np.concatenate(([0], np.cumsum(np.linalg.norm(np.diff(co[loop], axis=0), axis=1))))
+        return loop, length / max(length[-1], 1e-12)
+
+    a, ta = closed(outer)
+    b, tb = closed(inner)
+    steps = np.concatenate((np.zeros(len(ta) - 1, dtype=bool), np.ones(len(tb) - 1, dtype=bool)))
+    steps = steps[np.argsort(np.concatenate((ta[1:], tb[1:])), kind='stable')]
+    i = np.cumsum(~steps) - ~steps
+    j = np.cumsum(steps) - steps
+    return np.where(steps[:, None],
+                    np.column_stack((b[j], b[np.minimum(j + 1, len(b) - 1)], a[i])),
+                    np.column_stack((a[np.minimum(i + 1, len(a) - 1)], a[i], b[j])))
+
+
+def clean_patch(patch_faces, loop_start, loop_total, loop_verts, vert_count, iterations=3):
+    # Drops faces around vertices where the clipped patch boundary pinches,
+    # so every boundary vertex has exactly two boundary edges.
+    for _ in range(iterations):
+        submesh = Submesh(loop_start, loop_total, loop_verts, patch_faces, vert_count)
+        edges, loop_edges, counts = polygon_edges(submesh.loop_start, submesh.loop_total, submesh.loop_verts)
+        valence = np.bincount(edges[counts == 1].ravel(), minlength=len(submesh.vert_index))
+        pinched = valence[submesh.loop_verts] > 2
+        if not pinched.any():
+            break
+        drop = np.bincount(submesh.loop_face, weights=pinched, minlength=len(submesh.face_index)) > 0
+        patch_faces = submesh.face_index[~drop]
+    return patch_faces
+
+
+def region_voxel_remesh(ob, voxel_size, margin=3.0, threshold=0.5, min_island=8):
+    # Voxel remeshes the masked faces plus a margin of margin voxels, keeps the
+    # remeshed surface over the masked faces only and stitches it into the
+    # hole left by them. Returns the new face count, or None without a mask.
+    mesh = ob.data
+    arrays = MeshArrays(mesh)
+    co = arrays.co.astype(np.float64)
+    loop_start, loop_total, loop_verts = arrays.polygons
+    inner_faces = arrays.face_mask > threshold
+    if not inner_faces.any():
+        return None
+
+    inner_verts = np.zeros(len(co), dtype=bool)
+    inner_verts[loop_verts[np.repeat(inner_faces, loop_total)]] = True
+    adjacency = adjacency_matrix(arrays.edges, len(co))
+    region_verts = grow_region(adjacency, co, inner_verts, margin * voxel_size)
+    loop_face = np.repeat(np.arange(len(loop_start)), loop_total)
+    region_faces = np.flatnonzero(np.bincount(loop_face, weights=region_verts[loop_verts], minlength=len(loop_start)))
+
+    # Cut out the region, close it and remesh it.
+    region = Submesh(loop_start, loop_total, loop_verts, region_faces, len(co))
+    source = region.to_mesh(arrays, '.region_remesh', attributes=())
+    fill_holes(source)
+    remeshed = voxel_remesh_mesh(source, voxel_size)
+    bpy.data.meshes.remove(source)
+    patch_arrays = MeshArrays(remeshed)
+    patch_co = patch_arrays.co.astype(np.float64)
+    patch_normals = patch_arrays.normals.astype(np.float64)
+    patch_start, patch_total, patch_verts = patch_arrays.polygons
+    bpy.data.meshes.remove(remeshed)
+
+    # Keep the remeshed faces whose vertices all lie over the masked faces.
+    projector = SurfaceProjector(bvh_from_arrays(co, loop_start, loop_total, loop_verts, region_faces))
+    points, normals, nearest = projector.nearest(patch_co)
+    nearest = np.where(nearest >= 0, region_faces[np.maximum(nearest, 0)], -1)
+    close = np.linalg.norm(points - patch_co, axis=1) < voxel_size * 2
+    # The shell around a thin masked area has both of its layers close to the
+    # surface, only the one facing the same way as the surface is kept.
+    facing = (patch_normals * normals).sum(axis=1) > 0
+    keep_verts = close & facing & (nearest >= 0) & inner_faces[np.maximum(nearest, 0)]
+    patch_face = np.repeat(np.arange(len(patch_start)), patch_total)
+    outside = np.bincount(patch_face, weights=~keep_verts[patch_verts], minlength=len(patch_start))
+    patch_faces = clean_patch(np.flatnonzero(outside == 0), patch_start, patch_total, patch_verts, len(patch_co))
+    islands = Submesh(patch_start, patch_total, patch_verts, patch_faces, len(patch_co)).islands(
+        polygon_edges(patch_start, patch_total, patch_verts)[1])
+    patch_faces = np.sort(np.concatenate([island for island in islands if len(island) >= min_island] or
+                                         [np.zeros(0, dtype=np.int64)]))
+    patch = Submesh(patch_start, patch_total, patch_verts, patch_faces, len(patch_co))
+
+    # Everything but the masked faces stays untouched.
+    outer = Submesh(loop_start, loop_total, loop_verts, ~inner_faces, len(co))
+    out_co = np.concatenate((co[outer.vert_index], patch_co[patch.vert_index]))
+    first_patch = len(outer.vert_index)
+    holes = [chain for chain in boundary_chains(outer.loop_start, outer.loop_total, outer.loop_verts)
+             if inner_verts[outer.vert_index[chain]].all()]
+    patch_loops = [chain + first_patch for chain in
+                   boundary_chains(patch.loop_start, patch.loop_total, patch.loop_verts)]
+
+    # Pair every hole with the closest patch boundary, anything left over is capped.
+    stitched = []
+    hole_centers = np.array([out_co[hole].mean(axis=0) for hole in holes]).reshape(-1, 3)
+    loop_centers = np.array([out_co[loop].mean(axis=0) for loop in patch_loops]).reshape(-1, 3)
+    distance = np.linalg.norm(hole_centers[:, None] - loop_centers[None], axis=2)
+    unpaired_holes = set(range(len(holes)))
+    unpaired_loops = set(range(len(patch_loops)))
+    for flat in np.argsort(distance, axis=None).tolist():
+        h, p = divmod(flat, len(patch_loops))
+        if h in unpaired_holes and p in unpaired_loops:
+            stitched.append(stitch_loops(holes[h], patch_loops[p], out_co))
+            unpaired_holes.discard(h)
+            unpaired_loops.discard(p)
+
+    cap_co = [np.zeros((0, 3))]
+    cap_totals = [np.zeros(0, dtype=np.int32)]
+    cap_verts = [np.zeros(0, dtype=np.int32)]
+    first_new = len(out_co)
+    for chain in [holes[h] for h in sorted(unpaired_holes)] + [patch_loops[p] for p in sorted(unpaired_loops)]:
+        new_co, totals, verts = cap_chain(out_co, chain, first_new)
+        first_new += len(new_co)
+        cap_co.append(new_co)
+        cap_totals.append(totals)
+        cap_verts.append(verts)
+    out_co = np.concatenate([out_co] + cap_co)
+
+    stitched = np.concatenate(stitched or [np.zeros((0, 3), dtype=np.int32)])
+    totals = np.concatenate([outer.loop_total, patch.loop_total, np.full(len(stitched), 3)] + cap_totals)
+    verts = np.concatenate([outer.loop_verts, patch.loop_verts + first_patch, stitched.ravel()] + cap_verts)
+    starts = np.zeros(len(totals), dtype=np.int32)
+    np.cumsum(totals[:-1], out=starts[1:])
+
+    # New vertices take their data from a corner of the nearest masked face,
+    # new faces from the face of their first corner. Edge data only carries
+    # over between untouched vertices.
+    attributes = read_attributes(mesh, edges=True)
+    groups = [group.name for group in ob.vertex_groups]
+    weights = vertex_group_weights(ob)
+    new_nearest = projector.nearest(out_co[first_patch:])[2]
+    new_loops = loop_start[region_faces[np.maximum(new_nearest, 0)]]
+    vert_loop = np.empty(len(co), dtype=np.int64)
+    vert_loop[loop_verts] = np.arange(len(loop_verts))
+    out_loop = np.concatenate((vert_loop[outer.vert_index], new_loops))
+    point_index = loop_verts[out_loop]
+    corner_index = np.concatenate((outer.loop_index, out_loop[verts[len(outer.loop_verts):]]))
+    face_index = np.concatenate((outer.face_index, loop_face[out_loop[verts[starts[len(outer.loop_total):]]]]))
+    mask = arrays.mask[point_index]
+    has_mask = mask_layer_get(mesh) is not None
+
+    mesh.clear_geometry()
+    mesh_write_arrays(mesh, out_co, starts, totals, verts)
+    edge_verts = np.full(len(out_co), -1, dtype=np.int64)
+    edge_verts[:first_patch] = outer.vert_index
+    edge_index = edge_source_index(read_edges(mesh), arrays.edges, edge_verts)
+    write_attributes(mesh, attributes, point_index, corner_index, face_index, edge_index)
+    write_vertex_groups(ob, groups, weights, point_index)
+    if has_mask:
+        write_mask(mesh, mask)
+    return len(totals)
 
 
 @register_class
@@ -45,27 +312,165 @@ class VoxelRemesh(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     open_dialog: bpy.props.BoolProperty(default=False)
+    area: bpy.props.EnumProperty(
+        name='Area',
+        items=(('OBJECT', 'Whole Object', 'Remesh the whole object'),
+               ('MASK', 'Masked Area', 'Remesh only the masked area and stitch it back into the mesh')),
+        options={'SKIP_SAVE'}
+    )
+    margin: bpy.props.FloatProperty(
+        name='Margin',
+        description='Voxels of surrounding surface remeshed along with the masked area',
+        default=3,
+        min=2
+    )
+    transfer: bpy.props.BoolProperty(
+        name='Transfer Attributes',
+        description='Resample mask, face sets, colors and vertex groups from the old surface onto the new mesh',
+        default=False
+    )
+    progressive: bpy.props.BoolProperty(
+        name='Progressive Preview',
+        description='Preview coarser remeshes while adjusting the voxel size and remesh on confirm',
+        default=False,
+        options={'SKIP_SAVE'}
+    )
 
     def invoke(self, context, event):
+        if self.progressive and self.area == 'OBJECT':
+            return self.invoke_preview(context)
         if self.open_dialog:
             wm = context.window_manager
             return wm.invoke_props_dialog(self)
         return self.execute(context)
 
+    def invoke_preview(self, context):
+        ob = context.active_object
+        mesh = ob.data
+        self.voxel_size = mesh.remesh_voxel_size
+        last_mode = ob.mode
+        bpy.ops.object.mode_set(mode='OBJECT')
+        self.preview = ProgressiveRemeshPreview(context, ob)
+        bpy.ops.object.mode_set(mode=last_mode)
+        self.preview.request(mesh.remesh_voxel_size, mesh.remesh_voxel_adaptivity)
+
+        self.timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        self.update_header(context)
+        return {'RUNNING_MODAL'}
+
+    def update_header(self, context):
+        level = 'estimate' if self.preview.level is None else f'preview at {self.preview.level}x'
+        status = 'refining' if not self.preview.done else 'ready'
+        context.area.header_text_set(
+            f'Voxel size {context.active_object.data.remesh_voxel_size:.4g}, '
+            f'~{self.preview.estimate:,} faces ({level}, {status}) | '
+            f'Wheel/+/-: size, Enter/LMB: remesh, Esc/RMB: cancel')
+
+    def in_view(self, context, event):
+        # Whether the mouse is over the 3D view the preview runs in, clicks and
+        # scrolling anywhere else (the properties editor) are left alone.
+        if context.area is None or context.area.type != 'VIEW_3D':
+            return False
+        for region in context.area.regions:
+            if region.type == 'WINDOW':
+                return (region.x <= event.mouse_x < region.x + region.width and
+                        region.y <= event.mouse_y < region.y + region.height)
+        return False
+
+    def finish_preview(self, context):
+        context.window_manager.event_timer_remove(self.timer)
+        context.area.header_text_set(None)
+        self.preview.free()
+
+    def modal(self, context, event):
+        mesh = context.active_object.data
+
+        if event.value == 'PRESS':
+            mouse = event.type in {'LEFTMOUSE', 'RIGHTMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE'}
+            if mouse and not self.in_view(context, event):
+                return {'PASS_THROUGH'}
+            if event.type in {'WHEELUPMOUSE', 'NUMPAD_PLUS', 'EQUAL'}:
+                mesh.remesh_voxel_size *= 1.1
+            elif event.type in {'WHEELDOWNMOUSE', 'NUMPAD_MINUS', 'MINUS'}:
+                mesh.remesh_voxel_size /= 1.1
+            elif event.type in {'RET', 'NUMPAD_ENTER', 'LEFTMOUSE'}:
+                self.finish_preview(context)
+                return self.execute(context)
+            elif event.type in {'ESC', 'RIGHTMOUSE'}:
+                mesh.remesh_voxel_size = self.voxel_size
+                self.finish_preview(context)
+                return {'CANCELLED'}
+            else:
+                return {'PASS_THROUGH'}
+            self.preview.request(mesh.remesh_voxel_size, mesh.remesh_voxel_adaptivity)
+            self.update_header(context)
+            return {'RUNNING_MODAL'}
+
+        if event.type == 'TIMER':
+            # Settings can also be changed from the properties editor.
+            self.preview.request(mesh.remesh_voxel_size, mesh.remesh_voxel_adaptivity)
+            if self.preview.step():
+                self.update_header(context)
+
+        return {'PASS_THROUGH'}
+
     def draw(self, context):
         layout = self.layout
         mesh = context.active_object.data
 
+        layout.prop(self, 'area')
+        if self.area == 'MASK':
+            layout.prop(self, 'margin')
         layout.prop(mesh, 'remesh_voxel_size')
+        if self.area == 'OBJECT':
+            faces = estimate_voxel_faces(surface_area(mesh), mesh.remesh_voxel_size)
+            layout.label(text=f'About {faces:,} faces')
         layout.prop(mesh, 'remesh_voxel_adaptivity')
         layout.prop(mesh, 'use_remesh_fix_poles')
         layout.prop(mesh, 'use_remesh_smooth_normals')
         layout.prop(mesh, 'use_remesh_preserve_volume')
-        layout.prop(mesh, 'use_remesh_preserve_paint_mask')
-        layout.prop(mesh, 'use_remesh_preserve_sculpt_face_sets')
+        if self.area == 'OBJECT':
+            layout.prop(self, 'transfer')
+        if self.area == 'MASK' or not self.transfer:
+            layout.prop(mesh, 'use_remesh_preserve_paint_mask')
+            layout.prop(mesh, 'use_remesh_preserve_sculpt_face_sets')
 
     def execute(self, context):
-        bpy.ops.object.voxel_remesh()
+        ob = context.active_object
+        if self.area == 'OBJECT' and not self.transfer:
+            bpy.ops.object.voxel_remesh()
+            return {'FINISHED'}
+
+        if self.area == 'OBJECT':
+            last_mode = ob.mode
+            bpy.ops.object.mode_set(mode='OBJECT')
+            transfer = AttributeTransfer(ob)
+            # Blender's own mask and face set reprojection would only be overwritten.
+            mesh = ob.data
+            preserve = mesh.use_remesh_preserve_paint_mask, mesh.use_remesh_preserve_sculpt_face_sets
+            mesh.use_remesh_preserve_paint_mask = mesh.use_remesh_preserve_sculpt_face_sets = False
+            bpy.ops.object.voxel_remesh()
+            mesh.use_remesh_preserve_paint_mask, mesh.use_remesh_preserve_sculpt_face_sets = preserve
+            start = time.perf_counter()
+            transfer.apply(ob)
+            bpy.ops.object.mode_set(mode=last_mode)
+            self.report({'INFO'}, f'Transferred attributes to {len(ob.data.vertices):,} vertices '
+                                  f'in {time.perf_counter() - start:.2f} s')
+            return {'FINISHED'}
+
+        if ob.data.shape_keys:
+            self.report({'ERROR'}, 'Meshes with shape keys can\'t be remeshed by area')
+            return {'CANCELLED'}
+        last_mode = ob.mode
+        bpy.ops.object.mode_set(mode='OBJECT')
+        start = time.perf_counter()
+        faces = region_voxel_remesh(ob, ob.data.remesh_voxel_size, self.margin)
+        bpy.ops.object.mode_set(mode=last_mode)
+        if faces is None:
+            self.report({'WARNING'}, 'Nothing is masked')
+            return {'CANCELLED'}
+        self.report({'INFO'}, f'Remeshed masked area in {time.perf_counter() - start:.2f} s, {faces} faces')
         return {'FINISHED'}
 
 
@@ -89,7 +494,6 @@ class Decimate(bpy.types.Operator):
         return is_mesh_pool(context)
 
     def invoke(self, context, event):
-        bpy.ops.object.mode_set(mode='OBJECT')
         bpy.ops.ed.undo_push()
         wm = context.window_manager
         return wm.invoke_props_dialog(self)
@@ -97,75 +501,265 @@ class Decimate(bpy.types.Operator):
     def execute(self, context):
         bpy.ops.ed.undo_push()
         ob = context.active_object
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='SELECT')
-        bpy.ops.mesh.decimate(ratio=self.ratio)
-        bpy.ops.object.mode_set(mode='OBJECT')
+        decimate_object(ob, self.ratio)
 
         return {'FINISHED'}
 
 
-# @register_class
+class IsotropicRemesher:
+    # Boundary preserving isotropic remesh. Every pass decides what to do from
+    # NumPy arrays of a scratch mesh (edge lengths, valences, face pairs) and
+    # hands the result to a single batched bmesh operator. Boundary edges are
+    # never split, collapsed or flipped and boundary vertices never move.
+    # With a sizing array (target length per vertex of the input mesh) the
+    # thresholds follow it, looked up through the nearest input face.
+    def __init__(self, mesh, target_length=0, sizing=None):
+        self.bm = bmesh.new()
+        self.bm.from_mesh(mesh)
+        bmesh.ops.triangulate(self.bm, faces=self.bm.faces)
+        self.projector = SurfaceProjector(BVHTree.FromBMesh(self.bm))
+        self.work = bpy.data.meshes.new('.remesh_work')
+
+        if target_length <= 0:
+            arrays = self.arrays()
+            target_length = self.edge_data(arrays)[1].mean()
+        self.target_length = target_length
+        self.face_sizing = None
+        if sizing is not None:
+            self.face_sizing = face_average(sizing, *self.arrays().polygons)
+
+    def arrays(self):
+        self.bm.normal_update()
+        self.bm.to_mesh(self.work)
+        return MeshArrays(self.work)
+
+    def edges_of(self, indices):
+        self.bm.edges.ensure_lookup_table()
+        return [self.bm.edges[i] for i in indices.tolist()]
+
+    @staticmethod
+    def edge_data(arrays):
+        edges = arrays.edges
+        co = arrays.co
+        lengths = np.linalg.norm(co[edges[:, 0]] - co[edges[:, 1]], axis=1)
+        locked_edges = edge_face_count(arrays.loop_edges, len(edges)) != 2
+        locked_verts = np.zeros(len(co), dtype=bool)
+        locked_verts[edges[locked_edges].ravel()] = True
+        return edges, lengths, locked_edges, locked_verts
+
+    def edge_targets(self, co, edges):
+        if self.face_sizing is None:
+            return self.target_length
+        faces = self.projector.nearest(co)[2]
+        sizing = np.where(faces >= 0, self.face_sizing[faces], self.target_length)
+        return (sizing[edges[:, 0]] + sizing[edges[:, 1]]) * 0.5
+
+    def split(self):
+        arrays = self.arrays()
+        edges, lengths, locked_edges, locked_verts = self.edge_data(arrays)
+        high = self.edge_targets(arrays.co, edges) * 4 / 3
+        split = np.flatnonzero((lengths > high) & ~locked_edges)
+        if len(split):
+            bmesh.ops.subdivide_edges(self.bm, edges=self.edges_of(split), cuts=1)
+            bmesh.ops.triangulate(self.bm, faces=self.bm.faces)
+        return len(split)
+
+    def collapse(self):
+        arrays = self.arrays()
+        edges, lengths, locked_edges, locked_verts = self.edge_data(arrays)
+        co = arrays.co
+        high = np.broadcast_to(self.edge_targets(co, edges) * 4 / 3, lengths.shape)
+        candidates = np.flatnonzero((lengths < high * 3 / 5) & ~locked_verts[edges].any(axis=1))
+        candidates = candidates[np.argsort(lengths[candidates], kind='stable')]
+
+        # Shortest edges first and no two collapses sharing a vertex.
+        collapse = candidates[independent_pairs(edges[candidates], len(co))]
+
+        # Skip collapses that would stretch a neighboring edge past the split length.
+        adjacency = adjacency_matrix(edges, len(co))
+        mid = (co[edges[collapse, 0]] + co[edges[collapse, 1]]) * 0.5
+        reach = np.zeros(len(collapse))
+        for side in (0, 1):
+            offsets, owner = adjacency.gather(edges[collapse, side])
+            dist = np.linalg.norm(co[adjacency.indices[offsets]] - mid[owner], axis=1)
+            np.maximum.at(reach, owner, dist)
+        collapse = collapse[reach < high[collapse]]
+
+        if len(collapse):
+            bmesh.ops.collapse(self.bm, edges=self.edges_of(collapse))
+        return len(collapse)
+
+    def flip(self):
+        arrays = self.arrays()
+        edges, lengths, locked_edges, locked_verts = self.edge_data(arrays)
+        co = arrays.co
+        loop_start, loop_total, loop_verts = arrays.polygons
+        loop_edges = arrays.loop_edges
+        nxt = loop_next(loop_start, loop_total)
+        opposite = loop_verts[nxt[nxt]]
+        loop_face = np.repeat(np.arange(len(loop_start)), loop_total)
+
+        order = np.argsort(loop_edges, kind='stable')
+        pair = np.flatnonzero(loop_edges[order][1:] == loop_edges[order][:-1])
+        l1 = order[pair]
+        l2 = order[pair + 1]
+        edge = loop_edges[l1]
+        keep = ~locked_edges[edge] & (loop_total[loop_face[l1]] == 3) & (loop_total[loop_face[l2]] == 3)
+        l1, l2, edge = l1[keep], l2[keep], edge[keep]
+
+        a = loop_verts[l1]
+        b = loop_verts[nxt[l1]]
+        c = opposite[l1]
+        d = opposite[l2]
+
+        valence = np.bincount(edges.ravel(), minlength=len(co))
+        target = np.where(locked_verts, 4, 6)
+        deviation = valence - target
+        before = np.abs(deviation[a]) + np.abs(deviation[b]) + np.abs(deviation[c]) + np.abs(deviation[d])
+        after = (np.abs(deviation[a] - 1) + np.abs(deviation[b] - 1) +
+                 np.abs(deviation[c] + 1) + np.abs(deviation[d] + 1))
+        gain = before - after
+
+        # The new triangles (a, d, c) and (d, b, c) must face the same way as
+        # the old pair, otherwise the flip would fold the surface.
+        normal = np.cross(co[b] - co[a], co[c] - co[a]) + np.cross(co[a] - co[b], co[d] - co[b])
+        new1 = np.cross(co[d] - co[a], co[c] - co[a])
+        new2 = np.cross(co[b] - co[d], co[c] - co[d])
+        valid = (gain > 0) & (c != d) & ((new1 * normal).sum(axis=1) > 0) & ((new2 * normal).sum(axis=1) > 0)
+        candidates = np.flatnonzero(valid)
+        candidates = candidates[np.argsort(-gain[candidates], kind='stable')]
+
+        faces = np.stack((loop_face[l1[candidates]], loop_face[l2[candidates]]), axis=1)
+        flip = edge[candidates[independent_pairs(faces, len(loop_start))]]
+
+        if len(flip):
+            bmesh.ops.rotate_edges(self.bm, edges=self.edges_of(flip), use_ccw=False)
+        return len(flip)
+
+    def relax(self, factor=0.5):
+        arrays = self.arrays()
+        edges, lengths, locked_edges, locked_verts = self.edge_data(arrays)
+        co = arrays.co.astype(np.float64)
+        normals = arrays.normals.astype(np.float64)
+        mean = mean_matrix(adjacency_matrix(edges, len(co), dtype=np.float64))
+
+        disp = mean @ co - co
+        disp -= (disp * normals).sum(axis=1)[:, None] * normals
+        free = ~locked_verts
+        co[free] += disp[free] * factor
+        co[free] = self.projector.snap(co[free])
+
+        arrays.write_coords(co)
+        self.bm.clear()
+        self.bm.from_mesh(self.work)
+        return int(free.sum())
+
+    def iterate(self):
+        timings = {}
+        for name, step in (('split', self.split), ('collapse', self.collapse),
+                           ('flip', self.flip), ('relax', self.relax)):
+            start = time.perf_counter()
+            step()
+            timings[name] = time.perf_counter() - start
+        return timings
+
+    def to_mesh(self, mesh):
+        self.bm.to_mesh(mesh)
+        self.free()
+
+    def free(self):
+        self.bm.free()
+        bpy.data.meshes.remove(self.work)
+
+
+@register_class
 class BoundaryLockedRemesh(bpy.types.Operator):
     bl_idname = 'sculpt_tool_kit.bdremesh'
     bl_label = 'Boundary Locked Remesh'
-    bl_description = 'Remesh meshes with boundaries'
+    bl_description = 'Isotropic remesh that keeps open boundaries in place'
     bl_options = {'REGISTER', 'UNDO'}
 
-    bm = None
-    Iterations: bpy.props.IntProperty(name='Iterations', default=15)
+    iterations: bpy.props.IntProperty(name='Iterations', default=5, min=1)
+    target_length: bpy.props.FloatProperty(
+        name='Edge Length',
+        description='Target edge length, 0 keeps the current average edge length',
+        default=0,
+        min=0,
+        subtype='DISTANCE'
+    )
+    density: bpy.props.EnumProperty(
+        name='Density',
+        items=(('UNIFORM', 'Uniform', 'Same edge length everywhere'),
+               ('CURVATURE', 'Curvature', 'Shorter edges where the surface bends, Edge Length on flat areas'))
+    )
+    tolerance: bpy.props.FloatProperty(
+        name='Tolerance',
+        description='Distance the remeshed surface may cut across curved areas, 0 uses 1% of the edge length',
+        default=0,
+        min=0,
+        subtype='DISTANCE'
+    )
+    min_ratio: bpy.props.FloatProperty(
+        name='Min Length',
+        description='Shortest edge length as a fraction of Edge Length',
+        default=0.2,
+        min=0.01,
+        max=1
+    )
+    mask_factor: bpy.props.FloatProperty(
+        name='Mask Detail',
+        description='Edges in masked areas are shorter by this factor',
+        default=1,
+        min=1
+    )
 
-    def pool(self, context):
-        return context.active_object and context.active_object.type == 'MESH'
+    @classmethod
+    def poll(cls, context):
+        return is_mesh_pool(context)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'iterations')
+        layout.prop(self, 'target_length')
+        layout.prop(self, 'density')
+        if self.density == 'CURVATURE':
+            layout.prop(self, 'tolerance')
+            layout.prop(self, 'min_ratio')
+            layout.prop(self, 'mask_factor')
 
     def execute(self, context):
         ob = context.active_object
-        bm = bmesh.new()
-        bm.from_mesh(ob.data)
-        for i in range(self.Iterations):
-            self.edge_length_soften_from_bd(bm)
-            self.edge_length_equalize(bm)
-        bm.to_mesh(ob.data)
-        bpy.context.area.tag_redraw()
-        return {'FINISHED'}
-
-    @staticmethod
-    def edge_length_soften_from_bd(bm):
-        seen_verts = set()
-        split = []
-        collapse = []
-        e_lengths = [e.calc_length() for e in bm.edges]
-        bm.edges.ensure_lookup_table()
-        for edge in bm.edges:
-            if edge.is_boundary:
-                continue
-            avg_le = 0
-            tot = 0
-            for face in edge.link_faces:
-                for o_edge in face.edges:
-                    if o_edge is not edge:
-                        avg_le += e_lengths[o_edge.index]
-                        tot += 1
-            avg_le /= tot
-            if e_lengths[edge.index] > 1.5 * avg_le:
-                split.append(edge)
-
-            elif e_lengths[edge.index] < 0.5 * avg_le:
-                verts = set(edge.verts)
-                if not verts & seen_verts and not True in (v.is_boundary for v in verts):
-                    collapse.append(edge)
-                    seen_verts |= verts
-
-        bmesh.ops.collapse(bm, edges=collapse)
-        bmesh.ops.subdivide_edges(bm, edges=[e for e in split if e.is_valid], cuts=1)
-        bmesh.ops.triangulate(bm, faces=bm.faces)
-        bmesh.ops.dissolve_verts(bm, verts=[v for v in bm.verts if not v.is_boundary and len(v.link_edges) < 4])
+        last_mode = ob.mode
+        bpy.ops.object.mode_set(mode='OBJECT')
 
-    @staticmethod
-    def edge_length_equalize(bm):
-        for vert in bm.verts:
-            if not vert.is_boundary:
-                edge = max(vert.link_edges, key=lambda e: (e.other_vert(vert).co - vert.co).length_squared)
-                d = vert.co - edge.other_vert(vert).co
-                d -= vert.normal.dot(d) * vert.normal
-                vert.co -= d * 0.05
+        sizing = None
+        if self.density == 'CURVATURE':
+            arrays = MeshArrays(ob.data)
+            analysis = MeshAnalysis.get(arrays)
+            max_length = self.target_length or analysis.edge_lengths.mean()
+            tolerance = self.tolerance or max_length * 0.01
+            mask = arrays.mask if self.mask_factor > 1 else None
+            sizing = curvature_sizing(analysis, arrays.edges, max_length, max_length * self.min_ratio,
+                                      tolerance, mask, self.mask_factor)
+            area = analysis.face_areas.sum()
+
+        remesher = IsotropicRemesher(ob.data, self.target_length, sizing)
+        totals = []
+        passes = {}
+        for _ in range(self.iterations):
+            timings = remesher.iterate()
+            totals.append(sum(timings.values()))
+            for name, t in timings.items():
+                passes[name] = passes.get(name, 0) + t
+        remesher.to_mesh(ob.data)
+
+        bpy.ops.object.mode_set(mode=last_mode)
+        message = ('Remesh iterations: ' + ', '.join(f'{t * 1000:.0f} ms' for t in totals) +
+                   ' (' + ', '.join(f'{name} {t * 1000:.0f} ms' for name, t in passes.items()) + ')')
+        if sizing is not None:
+            # A uniform remesh keeps the same detail only at the shortest length used anywhere.
+            uniform = int(area * 4 / 3 ** 0.5 / sizing.min() ** 2)
+            message = (f'{len(ob.data.polygons):,} faces, a uniform remesh at {sizing.min():.4g} '
+                       f'would need about {uniform:,}. ' + message)
+        self.report({'INFO'}, message)
+        return {'FINISHED'}
@@ -0,0 +1,22 @@
+# Runs inside a background Blender started by BatchVoxelRemesh:
+#   blender -b --factory-startup --python remesh_worker.py -- <source.blend> <result.blend>
+# Remeshes the single mesh stored in the source file with its own voxel
+# remesh settings and writes the result to the result file.
+import bpy
+import sys
+
+
+def main():
+    source, result = sys.argv[sys.argv.index('--') + 1:][:2]
+    with bpy.data.libraries.load(source) as (data_from, data_to):
+        data_to.meshes = list(data_from.meshes)
+    mesh = data_to.meshes[0]
+
+    ob = bpy.data.objects.new('remesh', mesh)
+    bpy.context.scene.collection.objects.link(ob)
+    bpy.context.view_layer.objects.active = ob
+    bpy.ops.object.voxel_remesh()
+    bpy.data.libraries.write(result, {ob.data}, fake_user=True)
+
+
+main()
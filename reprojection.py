@@ -0,0 +1,200 @@
+import bpy
+import bmesh
+import numpy as np
+from bpy.app.handlers import persistent
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from mathutils.bvhtree import BVHTree
+from mathutils.kdtree import KDTree
+from .mesh_arrays import read_coords, geometry_fingerprint
+from .mask_filters import AdjacencyCache
+from .mesh_analysis import MeshAnalysis
+from .multifile import register_function, unregister_function
+
+CHUNK_SIZE = 65536
+
+
+def bvh_from_mesh(mesh, matrix=None):
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    if matrix is not None:
+        bm.transform(matrix)
+    tree = BVHTree.FromBMesh(bm)
+    bm.free()
+    return tree
+
+
+def bvh_from_arrays(co, loop_start, loop_total, loop_verts, faces=None):
+    if faces is not None:
+        loop_start = loop_start[faces]
+        loop_total = loop_total[faces]
+        loop_verts = loop_verts[np.repeat(loop_start - np.cumsum(loop_total) + loop_total, loop_total) +
+                                np.arange(loop_total.sum())]
+        loop_start = np.cumsum(loop_total) - loop_total
+    if len(loop_total) and (loop_total == 3).all():
+        polygons = loop_verts.reshape(-1, 3).tolist()
+    else:
+        polygons = [polygon.tolist() for polygon in np.split(loop_verts, loop_start[1:])]
+    return BVHTree.FromPolygons(co.tolist(), polygons)
+
+
+class SurfaceProjector:
+    # Nearest point queries for whole coordinate arrays. The per point call
+    # still goes through BVHTree.find_nearest, but it is driven by map() and
+    # the results are unpacked in bulk instead of touching BMVerts one by one.
+    # Large query sets can be split across a thread pool. mathutils does not
+    # release the GIL during the search, so how much extra workers gain
+    # depends on the build; benchmarks/bench_reprojection.py reports both.
+    def __init__(self, tree, workers=1, chunk_size=CHUNK_SIZE):
+        self.tree = tree
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_mesh(cls, mesh, matrix=None, **kwargs):
+        return cls(bvh_from_mesh(mesh, matrix), **kwargs)
+
+    def _query(self, co):
+        results = list(map(self.tree.find_nearest, co.tolist()))
+        if not results:
+            return np.empty((0, 3)), np.empty((0, 3)), np.empty(0, dtype=np.int64)
+
+        locations, normals, indices, _ = zip(*results)
+        if None in indices:
+            missing = [i for i, index in enumerate(indices) if index is None]
+            locations = list(locations)
+            normals = list(normals)
+            indices = list(indices)
+            for i in missing:
+                locations[i] = co[i]
+                normals[i] = (0, 0, 0)
+                indices[i] = -1
+        return np.array(locations, dtype=np.float64), np.array(normals, dtype=np.float64), np.array(indices)
+
+    def nearest(self, co):
+        # Returns (points, normals, face_indices); queries that found nothing
+        # keep their input point and get face index -1.
+        co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+        if self.workers <= 1 or len(co) <= self.chunk_size:
+            return self._query(co)
+
+        chunks = [co[i:i + self.chunk_size] for i in range(0, len(co), self.chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self._query, chunks))
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    def snap(self, co):
+        return self.nearest(co)[0]
+
+
+class SpatialCache:
+    # BVH and KD trees of evaluated objects shared by every tool in the
+    # add-on, keyed by object and kind and checked against a fingerprint of
+    # the evaluated coordinates. While the depsgraph handler is registered the
+    # fingerprint is only recomputed for objects whose geometry was updated,
+    # so repeated interactive queries go straight to the stored tree. Least
+    # recently used trees are dropped once the estimated size passes budget.
+    entries = OrderedDict()
+    dirty = set()
+    tracking = False
+    budget = 512 * 2 ** 20
+
+    @classmethod
+    def bvh(cls, ob, depsgraph=None):
+        return cls.get(ob, 'BVH', depsgraph)
+
+    @classmethod
+    def kdtree(cls, ob, depsgraph=None):
+        return cls.get(ob, 'KD', depsgraph)
+
+    @classmethod
+    def projector(cls, ob, depsgraph=None, **kwargs):
+        return SurfaceProjector(cls.bvh(ob, depsgraph), **kwargs)
+
+    @classmethod
+    def get(cls, ob, kind, depsgraph=None):
+        ob = ob.original
+        key = (ob.as_pointer(), kind)
+        entry = cls.entries.get(key)
+        if entry is not None and cls.tracking and key not in cls.dirty:
+            cls.entries.move_to_end(key)
+            return entry[1]
+
+        if depsgraph is None:
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+        ob_eval = ob.evaluated_get(depsgraph)
+        mesh = ob_eval.to_mesh()
+        co = read_coords(mesh)
+        polygon_count = len(mesh.polygons)
+        fingerprint = geometry_fingerprint(co, polygon_count)
+        ob_eval.to_mesh_clear()
+        cls.dirty.discard(key)
+
+        if entry is not None and entry[0] == fingerprint:
+            cls.entries.move_to_end(key)
+            return entry[1]
+
+        if kind == 'BVH':
+            index = BVHTree.FromObject(ob_eval, depsgraph)
+            size = polygon_count * 96 + len(co) * 24
+        else:
+            index = KDTree(len(co))
+            for i, point in enumerate(co.tolist()):
+                index.insert(point, i)
+            index.balance()
+            size = len(co) * 48
+
+        cls.entries[key] = (fingerprint, index, size)
+        cls.entries.move_to_end(key)
+        cls.evict()
+        return index
+
+    @classmethod
+    def evict(cls):
+        total = sum(entry[2] for entry in cls.entries.values())
+        while total > cls.budget and len(cls.entries) > 1:
+            total -= cls.entries.popitem(last=False)[1][2]
+
+    @classmethod
+    def invalidate(cls, ob):
+        pointer = ob.original.as_pointer()
+        for key in list(cls.entries):
+            if key[0] == pointer:
+                del cls.entries[key]
+
+    @classmethod
+    def clear(cls):
+        cls.entries.clear()
+        cls.dirty.clear()
+
+
+@persistent
+def spatial_cache_tag(scene, depsgraph):
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+            pointer = update.id.original.as_pointer()
+            SpatialCache.dirty.update(key for key in SpatialCache.entries if key[0] == pointer)
+
+
+@persistent
+def spatial_cache_clear(dummy):
+    SpatialCache.clear()
+    AdjacencyCache.clear()
+    MeshAnalysis.clear()
+
+
+@register_function
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(spatial_cache_tag)
+    bpy.app.handlers.load_post.append(spatial_cache_clear)
+    SpatialCache.tracking = True
+
+
+@unregister_function
+def unregister():
+    SpatialCache.tracking = False
+    SpatialCache.clear()
+    AdjacencyCache.clear()
+    MeshAnalysis.clear()
+    bpy.app.handlers.depsgraph_update_post.remove(spatial_cache_tag)
+    bpy.app.handlers.load_post.remove(spatial_cache_clear)
@@ -1,6 +1,7 @@
 import bpy
 from . interactive import InteractiveOperator, screen_space_to_3d
 from . multifile import register_class, topbar_mt_app_system_add
+from . cap_fill import fill_holes
 from mathutils import Vector
 import bmesh
 from math import sin, cos, pi
@@ -50,12 +51,7 @@ def cut(context, points, thickness=0.0001, distance_multiplier=10, cyclic=True):
         md.object = cuter
         md.operation = 'DIFFERENCE'
         bpy.ops.object.modifier_apply(modifier=md.name)
-        bm = bmesh.new()
-        bm.from_mesh(ob.data)
-        bmesh.ops.holes_fill(bm, edges=bm.edges)
-        bmesh.ops.triangulate(
-            bm, faces=[face for face in bm.faces if len(face.verts) > 4])
-        bm.to_mesh(ob.data)
+        fill_holes(ob.data)
         bpy.ops.object.mode_set(mode='EDIT')
         bpy.ops.mesh.select_all(action='SELECT')
         bpy.ops.mesh.separate(type='LOOSE')
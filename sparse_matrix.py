@@ -0,0 +1,188 @@
+import numpy as np
+
+# Blender's bundled Python has NumPy but not SciPy, so the few sparse
+# operations the mesh tools need are implemented here on plain arrays.
+
+
+class CSRMatrix:
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+        self._rows = np.repeat(np.arange(shape[0], dtype=np.int32), np.diff(indptr))
+
+    @classmethod
+    def from_coo(cls, rows, cols, data, shape):
+        order = np.argsort(rows, kind='stable')
+        indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+        return cls(indptr, cols[order].astype(np.int32), data[order], shape)
+
+    @property
+    def row_lengths(self):
+        return np.diff(self.indptr)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes + self._rows.nbytes
+
+    def row_sums(self):
+        return self.dot(np.ones(self.shape[1], dtype=self.data.dtype))
+
+    def scale_rows(self, factors):
+        data = self.data * np.repeat(factors, self.row_lengths)
+        return CSRMatrix(self.indptr, self.indices, data.astype(self.data.dtype), self.shape)
+
+    def dot(self, x):
+        # bincount is considerably faster than np.add.reduceat/np.add.at for
+        # the short rows of mesh adjacency, so vectors go through it column by column.
+        if x.ndim == 1:
+            return np.bincount(self._rows, weights=x[self.indices] * self.data, minlength=self.shape[0])
+        return np.stack([self.dot(x[:, i]) for i in range(x.shape[1])], axis=1)
+
+    __matmul__ = dot
+
+    def gather(self, rows):
+        # Positions into indices/data of the entries of the given rows,
+        # concatenated, and which of the given rows each one belongs to.
+        starts = self.indptr[rows]
+        totals = self.indptr[np.asarray(rows) + 1] - starts
+        owner = np.repeat(np.arange(len(starts)), totals)
+        return np.repeat(starts - np.cumsum(totals) + totals, totals) + np.arange(totals.sum()), owner
+
+    def row_reduce(self, ufunc, x, include_diagonal=True):
+        # Reduces the values of every row's neighbors with a ufunc such as
+        # np.maximum, rows without entries keep their own value.
+        nonempty = self.indptr[:-1] < self.indptr[1:]
+        out = x.copy()
+        if nonempty.any():
+            reduced = ufunc.reduceat(x[self.indices], self.indptr[:-1][nonempty])
+            out[nonempty] = ufunc(out[nonempty], reduced) if include_diagonal else reduced
+        return out
+
+
+def adjacency_matrix(edges, vert_count, weights=None, dtype=np.float32):
+    # Symmetric vertex adjacency from an (N, 2) edge array.
+    rows = np.concatenate((edges[:, 0], edges[:, 1]))
+    cols = np.concatenate((edges[:, 1], edges[:, 0]))
+    if weights is None:
+        data = np.ones(len(rows), dtype=dtype)
+    else:
+        data = np.concatenate((weights, weights)).astype(dtype)
+    return CSRMatrix.from_coo(rows, cols, data, (vert_count, vert_count))
+
+
+def mean_matrix(adjacency):
+    # Row normalized adjacency: multiplying by it averages the neighbors.
+    # Vertices without neighbors average to themselves.
+    sums = adjacency.row_sums()
+    isolated = np.flatnonzero(sums == 0)
+    if len(isolated):
+        adjacency = CSRMatrix.from_coo(np.concatenate((adjacency._rows, isolated)),
+                                       np.concatenate((adjacency.indices, isolated)),
+                                       np.concatenate((adjacency.data, np.ones(len(isolated), adjacency.data.dtype))),
+                                       adjacency.shape)
+        sums[isolated] = 1
+    return adjacency.scale_rows(1 / sums)
+
+
+def connected_components(pairs, count):
+    # Vectorized union-find: hook the larger root of every pair under the
+    # smaller one and compress paths until no pair spans two roots.
+    parent = np.arange(count)
+    a = pairs[:, 0]
+    b = pairs[:, 1]
+    while True:
+        root_a = parent[a]
+        root_b = parent[b]
+        split = root_a != root_b
+        if not split.any():
+            break
+        np.minimum.at(parent, np.maximum(root_a[split], root_b[split]), np.minimum(root_a[split], root_b[split]))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    return np.unique(parent, return_inverse=True)[1]
+
+
+def independent_sets(owner, element, group_count, element_count, max_rounds=64):
+    # Greedy independent selection of groups that each claim some elements,
+    # given as (owner, element) pairs with lower owners having priority. A
+    # group wins a round when it is the first claim on all of its elements,
+    # groups touching anything already won drop out. Ties in priority should
+    # be shuffled by the caller, ordered chains need one round per link.
+    selected = np.zeros(group_count, dtype=bool)
+    alive = np.ones(group_count, dtype=bool)
+    taken = np.zeros(element_count, dtype=bool)
+    for _ in range(max_rounds):
+        live = alive[owner]
+        owner = owner[live]
+        element = element[live]
+        if not alive.any():
+            break
+        rank = np.full(element_count, group_count)
+        np.minimum.at(rank, element, owner)
+        lost = np.zeros(group_count, dtype=bool)
+        lost[owner[rank[element] != owner]] = True
+        won = alive & ~lost
+        selected |= won
+        alive &= ~won
+        taken[element[won[owner]]] = True
+        alive[owner[taken[element]]] = False
+    return np.flatnonzero(selected)
+
+
+def independent_edges(pairs, edges, count, max_rounds=16):
+    # Greedy selection over rows of an (N, 2) vertex pair array ordered by
+    # priority, keeping the ends of any two selected rows more than one of
+    # the (M, 2) edges apart. Every round each vertex takes its best row, rows
+    # that are best at both ends without a better one next to them win and
+    # rows next to a winner drop out. Plain scatters only, no ufunc.at, and
+    # np.compress instead of boolean indexing, which is much slower on masks
+    # this irregular.
+    a = pairs[:, 0]
+    b = pairs[:, 1]
+    u = edges[:, 0]
+    v = edges[:, 1]
+    order = np.arange(len(pairs), dtype=np.int32)
+    selected = []
+    for _ in range(max_rounds):
+        if not len(order):
+            break
+        ra = a[order]
+        rb = b[order]
+        # Reversed so the best row is written last at every vertex.
+        best = np.full(count, len(pairs), dtype=np.int32)
+        best[np.column_stack((ra, rb))[::-1].ravel()] = np.repeat(order[::-1], 2)
+        live = best < len(pairs)
+        # Only edges between two vertices with rows left can matter.
+        near = live[u] & live[v]
+        u = np.compress(near, u)
+        v = np.compress(near, v)
+        best_u = best[u]
+        best_v = best[v]
+        # Vertices next to a better row lose their own.
+        lose_u = np.compress(best_v < best_u, u)
+        lose_v = np.compress(best_u < best_v, v)
+        best[lose_u] = len(pairs)
+        best[lose_v] = len(pairs)
+        won = (best[ra] == order) & (best[rb] == order)
+        selected.append(np.compress(won, order))
+
+        blocked = np.zeros(count, dtype=bool)
+        blocked[np.compress(won, ra)] = True
+        blocked[np.compress(won, rb)] = True
+        ends = blocked.copy()
+        blocked[np.compress(ends[v], u)] = True
+        blocked[np.compress(ends[u], v)] = True
+        order = np.compress(~blocked[ra] & ~blocked[rb], order)
+    return np.sort(np.concatenate(selected)) if selected else order[:0]
+
+
+def independent_pairs(pairs, count):
+    # Rows of an (N, 2) array ordered by priority, no two selected rows share an element.
+    owner = np.repeat(np.arange(len(pairs)), 2)
+    return independent_sets(owner, pairs.ravel(), len(pairs), count)
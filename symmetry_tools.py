@@ -1,5 +1,9 @@
 import bpy
+import bmesh
+import numpy as np
 from .multifile import register_class
+from .mesh_arrays import MeshArrays
+from .reprojection import SurfaceProjector, bvh_from_arrays
 
 
 @register_class
@@ -21,6 +25,13 @@ class Symmetrize(bpy.types.Operator):
             ('NEGATIVE_Z', '-z to +z', '-z to +z')
         )
     )
+    method: bpy.props.EnumProperty(
+        name='Method',
+        items=(
+            ('TOPOLOGY', 'Topology', 'Replace one half of the mesh with a mirrored copy of the other'),
+            ('SURFACE', 'Surface', 'Keep the topology and snap one half onto the mirrored surface of the other')
+        )
+    )
 
     @classmethod
     def poll(cls, context):
@@ -29,14 +40,57 @@ class Symmetrize(bpy.types.Operator):
     def execute(self, context):
         bpy.ops.ed.undo_push()
         ob = context.active_object
-        if ob.mode == 'SCULPT' and ob.use_dynamic_topology_sculpting:
+        if self.method == 'SURFACE':
+            last_mode = ob.mode
+            bpy.ops.object.mode_set(mode='OBJECT')
+            self.surface_symmetrize(ob.data)
+            bpy.ops.object.mode_set(mode=last_mode)
+        elif ob.mode == 'SCULPT' and ob.use_dynamic_topology_sculpting:
             context.scene.tool_settings.sculpt.symmetrize_direction = self.axis
             bpy.ops.sculpt.symmetrize()
+        elif ob.mode == 'EDIT':
+            bm = bmesh.from_edit_mesh(ob.data)
+            self.topology_symmetrize(bm)
+            bmesh.update_edit_mesh(ob.data)
         else:
+            # Sculpt mode is left and entered again so its BVH is rebuilt for
+            # the new topology, without dynamic topology that is cheap.
             last_mode = ob.mode
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.select_all(action='SELECT')
-            bpy.ops.mesh.symmetrize(direction=self.axis)
+            bpy.ops.object.mode_set(mode='OBJECT')
+            bm = bmesh.new()
+            bm.from_mesh(ob.data)
+            self.topology_symmetrize(bm)
+            bm.to_mesh(ob.data)
+            bm.free()
+            ob.data.update()
             bpy.ops.object.mode_set(mode=last_mode)
 
         return {'FINISHED'}
+
+    def topology_symmetrize(self, bm):
+        # Same as mesh.symmetrize on everything, whose POSITIVE_X is bmesh's 'X'.
+        # Older versions take the index into -X, -Y, -Z, X, Y, Z instead.
+        direction = ('-' if self.axis.startswith('NEGATIVE') else '') + self.axis[-1]
+        if bpy.app.version < (2, 90, 0):
+            direction = ('-X', '-Y', '-Z', 'X', 'Y', 'Z').index(direction)
+        bmesh.ops.symmetrize(bm, input=bm.verts[:] + bm.edges[:] + bm.faces[:], direction=direction, dist=1e-4)
+
+    def surface_symmetrize(self, mesh):
+        arrays = MeshArrays(mesh)
+        co = arrays.co.astype(np.float64)
+        axis = 'XYZ'.index(self.axis[-1])
+        side = co[:, axis] * (1 if self.axis.startswith('POSITIVE') else -1)
+        target = side < 0
+        if not target.any() or target.all():
+            return
+
+        # Only the source half goes in the tree so points cannot snap back
+        # onto the half being replaced.
+        loop_start, loop_total, loop_verts = arrays.polygons
+        source_faces = np.flatnonzero(np.bincount(np.repeat(np.arange(len(loop_start)), loop_total),
+                                                  weights=side[loop_verts] >= 0, minlength=len(loop_start)) > 0)
+        projector = SurfaceProjector(bvh_from_arrays(co, loop_start, loop_total, loop_verts, source_faces))
+        mirror = np.ones(3)
+        mirror[axis] = -1
+        co[target] = projector.snap(co[target] * mirror) * mirror
+        arrays.write_coords(co)